@@ -0,0 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from book import load_book
+from search import MoveOrdering, SearchStats, TranspositionTable, iterative_deepening, load_weights
+from workers import worker_context
+
+# Runs the AI search in a background worker so the frame loop never waits
+# on it. The worker searches a snapshot of the game; results for a state
+# that has since changed are thrown away. With search_workers set, the
+# search runs on a thread here and splits its root moves over that many
+# processes (parallel_search.py).
+
+_tt = None  # One transposition table per worker, kept between moves
+_ordering = None  # Killer/history tables, kept the same way
+_stop = None  # Event the front end sets to cancel the running search
+_book = None  # Opening book, memory-mapped in the worker
+_parallel = None  # ParallelSearch when the root moves are split over processes
+
+
+def _init_worker(stop_event, book_path=None, search_workers=0, weights_path=None):
+    global _stop, _book, _parallel
+    _stop = stop_event
+    _book = load_book(book_path) if book_path else None
+    if weights_path:
+        load_weights(weights_path)
+    if search_workers:
+        from parallel_search import ParallelSearch
+        _parallel = ParallelSearch(search_workers, stop_event=stop_event)
+
+
+def search_move(state, side, budget_ms, max_depth):
+    global _tt, _ordering
+    if _tt is None:
+        _tt = TranspositionTable()
+        _ordering = MoveOrdering()
+    # A cancel aimed at the previous search has done its job by now
+    _stop.clear()
+    stats = SearchStats()
+    if _book is not None:
+        move = _book.lookup(state, side)
+        if move is not None:
+            stats.book_move = True
+            return move, stats
+    stats.stop = _stop
+    if _parallel is not None:
+        move = _parallel.iterative_deepening(state, side, budget_ms, stats, _tt, max_depth, _ordering)
+    else:
+        move = iterative_deepening(state, side, budget_ms, stats, _tt, max_depth, _ordering)
+    stats.stop = None
+    return move, stats
+
+
+class AIWorker:
+    def __init__(self, book_path=None, search_workers=0, weights_path=None):
+        context = worker_context()
+        # Shared with the search processes, so the front end can cancel them
+        self.stop_event = context.Event()
+        if search_workers:
+            _init_worker(self.stop_event, book_path, search_workers, weights_path)
+            self.executor = ThreadPoolExecutor(1)
+        else:
+            self.executor = ProcessPoolExecutor(1, context, _init_worker,
+                                                (self.stop_event, book_path, 0, weights_path))
+        self.future = None
+        self.request = None  # (state version, side) of the running search
+
+    def busy(self):
+        return self.future is not None
+
+    def start(self, state, side, budget_ms, max_depth, version):
+        self.cancel()
+        self.future = self.executor.submit(search_move, state.copy(), side, budget_ms, max_depth)
+        self.request = (version, side)
+
+    def poll(self, version):
+        # (side, move, stats) once the search is done, or None. A result for
+        # an older state version is dropped.
+        if self.future is None or not self.future.done():
+            return None
+        future = self.future
+        request_version, side = self.request
+        self.future = None
+        self.request = None
+        if request_version != version or future.cancelled():
+            return None
+        move, stats = future.result()
+        return side, move, stats
+
+    def cancel(self):
+        if self.future is not None:
+            if not self.future.cancel():
+                self.stop_event.set()
+            self.future = None
+            self.request = None
+
+    def shutdown(self):
+        self.cancel()
+        # The cancel stops a running search within a few nodes. Waiting for
+        # it also lets the pool close its pipes before the interpreter exits.
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if _parallel is not None:
+            _parallel.shutdown()
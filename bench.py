@@ -0,0 +1,562 @@
+import argparse
+import math
+import multiprocessing
+import random
+import time
+import tracemalloc
+
+from game_state import AI, DIRECTIONS, EMPTY, GRID_HEIGHT, GRID_WIDTH, PLAYER, GameState, other_side, zobrist_keys
+from search import (MoveOrdering, SearchStats, TranspositionTable, best_square, evaluate, evaluate_square,
+                    get_best_move, minimax)
+
+# Benchmarks for the headless engine.
+#   python bench.py search              - nodes/sec, old vs new search
+#   python bench.py ordering            - pruning with and without move ordering
+#   python bench.py movegen             - per-call cost of move generation and evaluation
+#   python bench.py powerups            - power-up pickup and spawn cost as power-ups get dense
+#   python bench.py scaling --sizes ... - per-operation cost as the grid grows
+#   python bench.py parallel            - root-splitting search speedup vs worker count
+#   python bench.py evaluate            - NumPy batch evaluation vs the scalar evaluate
+
+
+def random_position(seed, plies=40, width=GRID_WIDTH, height=GRID_HEIGHT):
+    # Play random moves from the start position to get a mid-game board
+    rng = random.Random(seed)
+    state = GameState(width, height, seed)
+    side = PLAYER
+    for _ in range(plies):
+        moves = state.get_valid_moves(side)
+        if moves:
+            state.make_move(rng.choice(moves), side)
+        if rng.random() < 0.2:
+            state.spawn_power_up()
+        side = other_side(side)
+    state.undo_stack = []
+    return state
+
+
+# --- Copy-per-node search as it was in check.py, kept for comparison ---
+
+def legacy_valid_moves(state, pos):
+    moves = []
+    for dx, dy in DIRECTIONS:
+        new_x = pos[0] + dx
+        new_y = pos[1] + dy
+        if 1 <= new_x < state.width - 1 and 1 <= new_y < state.height - 1:
+            if (new_x, new_y) != tuple(state.ai_pos) and (new_x, new_y) != tuple(state.player_pos):
+                moves.append((new_x, new_y))
+    return moves
+
+
+def legacy_minimax(state, board, pos, depth, alpha, beta, is_ai, counter):
+    counter[0] += 1
+    # Leaves use the same evaluation as the new search so only the
+    # copy-vs-undo cost differs between the two figures
+    if depth == 0:
+        return evaluate(state)
+    valid_moves = legacy_valid_moves(state, pos)
+    if not valid_moves:
+        return evaluate(state)
+    best = float('-inf') if is_ai else float('inf')
+    for new_x, new_y in valid_moves:
+        old_board = [row[:] for row in board]
+        board[new_y][new_x] = 'ai' if is_ai else 'player'
+        eval = legacy_minimax(state, board, [new_x, new_y], depth - 1, alpha, beta, not is_ai, counter)
+        board[:] = [row[:] for row in old_board]
+        if is_ai:
+            best = max(best, eval)
+            alpha = max(alpha, eval)
+        else:
+            best = min(best, eval)
+            beta = min(beta, eval)
+        if beta <= alpha:
+            break
+    return best
+
+
+def bench_legacy(states, depth):
+    counter = [0]
+    elapsed = 0.0
+    for state in states:
+        # The old code's list-of-lists board of '' / 'player' / 'ai' strings
+        board = [[['', 'player', 'ai'][state.owner(x, y)] for x in range(state.width)]
+                 for y in range(state.height)]
+        start = time.perf_counter()
+        legacy_minimax(state, board, state.ai_pos, depth, float('-inf'), float('inf'), True, counter)
+        elapsed += time.perf_counter() - start
+    return counter[0], elapsed
+
+
+def bench_search(states, depth, tt=None):
+    stats = SearchStats()
+    for state in states:
+        get_best_move(state, AI, depth, stats, tt)
+    return stats.nodes, stats.elapsed
+
+
+def bench_ordering(states, depth):
+    # Same positions and depth, plain generation order vs killer/history
+    # ordering, each with a fresh transposition table. Ordering must only
+    # change how much is searched, never the value found.
+    rows = []
+    for name, ordering in (('plain', None), ('ordered', MoveOrdering())):
+        stats = SearchStats()
+        tt = TranspositionTable()
+        values = []
+        start = time.perf_counter()
+        for state in states:
+            if ordering is not None:
+                ordering.new_search()
+            tt.new_search()
+            values.append(minimax(state, depth, float('-inf'), float('inf'), AI, stats, tt, ordering))
+        stats.elapsed = time.perf_counter() - start
+        rows.append((name, stats, values))
+
+    print(f"{'ordering':>8} {'nodes/move':>11} {'branching':>10} {'cutoffs':>8} {'1st-move':>9} {'time':>8}")
+    for name, stats, _ in rows:
+        print(f"{name:>8} {stats.nodes / len(states):>11,.0f} {stats.branching_factor():>10.2f} "
+              f"{stats.cutoff_rate():>8.1%} {stats.first_move_cutoff_rate():>9.1%} {stats.elapsed:>7.3f}s")
+    assert rows[0][2] == rows[1][2], "move ordering changed a search result"
+    plain, ordered = rows[0][1], rows[1][1]
+    print(f"ordered search visits {ordered.nodes / plain.nodes:.1%} of the plain search's nodes")
+    return plain, ordered
+
+
+# --- Coordinate-based move generation and evaluation as they were before
+# the precomputed move tables, kept for comparison ---
+
+def coordinate_valid_moves(state, side):
+    pos = state.positions[side]
+    other = state.positions[other_side(side)]
+    moves = []
+    for dx, dy in DIRECTIONS:
+        new_x = pos[0] + dx
+        new_y = pos[1] + dy
+        if 1 <= new_x < state.width - 1 and 1 <= new_y < state.height - 1:
+            if new_x != other[0] or new_y != other[1]:
+                moves.append((new_x, new_y))
+    return moves
+
+
+def coordinate_evaluate_position(state, pos, side):
+    cells = state.cells
+    width = state.width
+    enemy = other_side(side)
+    index = pos[1] * width + pos[0]
+    score = 0
+    tile = cells[index]
+    if tile == enemy:
+        score += 3
+    elif tile == EMPTY:
+        score += 1
+    power_type = state.power_up_at(index)
+    if power_type == 'bonus':
+        score += 2
+    elif power_type == 'freeze':
+        score -= 2
+    for neighbour in (index + width, index - width, index + 1, index - 1):
+        if cells[neighbour] == enemy:
+            score += 1
+    return score
+
+
+def coordinate_best_square(state, side):
+    moves = coordinate_valid_moves(state, side)
+    if not moves:
+        return 0
+    return max(coordinate_evaluate_position(state, move, side) for move in moves)
+
+
+def table_move_loop(state, side):
+    # What the search does per node: walk the shared target tuple
+    origin = state.piece_cells[side]
+    blocked = state.blocked_cell(side)
+    for offset in state.move_offsets(side):
+        if origin + offset != blocked:
+            pass
+
+
+def bench_movegen(states):
+    # Per-call cost in nanoseconds, averaged over the positions
+    names = ['move generation', 'evaluate square', 'best square']
+    totals = {name: [0.0, 0.0] for name in names}
+    for state in states:
+        assert coordinate_valid_moves(state, AI) == state.get_valid_moves(AI)
+        assert coordinate_best_square(state, AI) == best_square(state, AI)
+        square = state.get_valid_moves(AI)[0]
+        index = square[1] * state.width + square[0]
+        pairs = [
+            (lambda: coordinate_valid_moves(state, AI), lambda: table_move_loop(state, AI)),
+            (lambda: coordinate_evaluate_position(state, square, AI), lambda: evaluate_square(state, index, AI)),
+            (lambda: coordinate_best_square(state, AI), lambda: best_square(state, AI)),
+        ]
+        for name, (before, after) in zip(names, pairs):
+            totals[name][0] += time_per_call(before, 0.01) * 1e9 / len(states)
+            totals[name][1] += time_per_call(after, 0.01) * 1e9 / len(states)
+    print(f"{'operation':>16} {'coordinates':>12} {'tables':>10} {'speedup':>8}")
+    for name in names:
+        old, new = totals[name]
+        print(f"{name:>16} {old:>10.0f}ns {new:>8.0f}ns {old / new:>7.2f}x")
+
+
+def fill_board(state, fraction, rng):
+    # Give a random fraction of the free tiles to the player
+    for index in list(state.free_cells):
+        if rng.random() < fraction:
+            state.cells[index] = PLAYER
+            state.counts[EMPTY] -= 1
+            state.counts[PLAYER] += 1
+            state.remove_free_cell(index)
+
+
+def list_pickup(power_ups, key):
+    # The old store: find the power-up in a list of (row, col), remove it and
+    # put it back the way unmake_move did
+    slot = power_ups.index(key)
+    del power_ups[slot]
+    power_ups.insert(slot, key)
+
+
+def rejection_spawn(state, rng):
+    # The old spawn: draw any playable tile and give up if it is taken
+    row = rng.randint(1, state.height - 2)
+    col = rng.randint(1, state.width - 2)
+    index = row * state.width + col
+    return state.cells[index] == EMPTY and not state.power_grid[index]
+
+
+def bench_powerups(counts, size):
+    # Cost of stepping onto a power-up (a whole make+unmake) with the power-up
+    # grid, next to just the list bookkeeping the old store needed for the
+    # same pickup, for growing numbers of power-ups; then how often a spawn
+    # attempt lands as the board fills up
+    rng = random.Random(0)
+    print(f"{'power-ups':>10} {'grid make+unmake':>17} {'list remove+insert':>19}")
+    for count in counts:
+        state = GameState(size, size, 0)
+        # One power-up right next to the AI, the rest anywhere
+        target = state.piece_cells[AI] + state.move_offsets(AI)[0]
+        state.place_power_up(target // size, target % size, 'freeze')
+        while state.power_up_count < count and state.free_cells:
+            row, col = divmod(rng.choice(state.free_cells), size)
+            state.place_power_up(row, col, 'freeze')
+        move = (target % size, target // size)
+        power_list = [divmod(index, size) for index in state.power_up_cells()]
+        key = divmod(target, size)
+        grid = time_per_call(lambda: make_unmake_move(state, move, AI)) * 1e9
+        listed = time_per_call(lambda: list_pickup(power_list, key)) * 1e9
+        print(f"{count:>10} {grid:>15.0f}ns {listed:>17.0f}ns")
+
+    print(f"{'board full':>10} {'free-cell spawn':>16} {'rejection spawn':>16}")
+    for fraction in (0.0, 0.5, 0.9, 0.99):
+        state = GameState(size, size, 0)
+        fill_board(state, fraction, rng)
+        hits = sum(rejection_spawn(state, rng) for _ in range(10000))
+        print(f"{fraction:>10.0%} {'100.0%' if state.free_cells else '0.0%':>16} {hits / 10000:>16.1%}")
+
+
+def make_unmake_move(state, move, side):
+    state.make_move(move, side)
+    state.unmake_move()
+
+
+def check_board_ops(states):
+    # The vectorized recounts must agree with the counts GameState maintains
+    try:
+        import board_ops
+    except ImportError:
+        print("NumPy not installed; skipping board_ops check.")
+        return
+    for state in states:
+        assert board_ops.tile_counts(state) == state.counts
+        adjacency = board_ops.adjacency_counts(state, PLAYER)
+        for y in range(1, state.height - 1):
+            for x in range(1, state.width - 1):
+                index = y * state.width + x
+                expected = sum(state.cells[n] == PLAYER
+                               for n in (index + 1, index - 1, index + state.width, index - state.width))
+                assert adjacency[y, x] == expected
+    print(f"board_ops recounts match on {len(states)} positions")
+
+
+def check_invariants(state):
+    # Everything GameState keeps incrementally, recomputed from the board
+    assert state.hash == state.compute_hash()
+    counts = [0] * (state.agents + 1)
+    free = []
+    for index, owner in enumerate(state.cells):
+        if state.tables['kinds'][index]:
+            counts[owner] += 1
+            if owner == EMPTY and not state.power_grid[index]:
+                free.append(index)
+    assert counts == state.counts
+    assert sorted(state.free_cells) == free
+    assert all(state.free_slot[index] == slot for slot, index in enumerate(state.free_cells))
+    assert state.power_up_count == sum(1 for code in state.power_grid if code)
+
+
+def snapshot(state):
+    return (bytes(state.cells), list(state.counts), [list(pos) for pos in state.positions[1:]],
+            list(state.scores), bytes(state.power_grid), state.power_up_count, list(state.free_cells), state.hash)
+
+
+def check_make_unmake(boards=300, seed=1):
+    # Random boards of 2-5 agents: runs of make_move must keep every
+    # incremental structure (free-cell swap, power-up count, hash) right,
+    # and unmaking them must restore the state exactly
+    rng = random.Random(seed)
+    for board in range(boards):
+        agents = rng.choice((2, 2, 3, 5))
+        low = 8 if agents > 2 else 5
+        state = GameState(rng.randint(low, 14), rng.randint(max(low, 4), 14), board, agents=agents)
+        for _ in range(rng.randint(0, 6)):
+            state.spawn_power_up()
+        check_invariants(state)
+        for _ in range(60):
+            before = snapshot(state)
+            made = 0
+            for _ in range(rng.randint(1, 5)):
+                side = rng.choice(state.sides)
+                moves = state.get_valid_moves(side)
+                if not moves:
+                    break
+                state.make_move(rng.choice(moves), side)
+                made += 1
+                check_invariants(state)
+            for _ in range(made):
+                state.unmake_move()
+            assert snapshot(state) == before
+            # Then a real move and maybe a spawn, so the boards fill up
+            side = rng.choice(state.sides)
+            moves = state.get_valid_moves(side)
+            if moves:
+                state.play_move(rng.choice(moves), side)
+            if rng.random() < 0.3:
+                state.spawn_power_up()
+            check_invariants(state)
+    print(f"make/unmake keeps counts, free cells, power-ups and hash on {boards} random boards")
+
+
+def time_per_call(fn, min_time=0.05):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def state_memory(width, height):
+    # Bytes allocated by one game state (shared Zobrist tables excluded)
+    zobrist_keys(width, height)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = GameState(width, height)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del state
+    return used
+
+
+def make_unmake(state, side):
+    state.make_move(state.get_valid_moves(side)[0], side)
+    state.unmake_move()
+
+
+def search_node_cost(state, depth):
+    stats = SearchStats()
+    get_best_move(state, AI, depth, stats)
+    return stats.elapsed / max(1, stats.nodes)
+
+
+# Work done once per move (or per search node); none of these should grow
+# with the board. 'snapshot copy' is the per-move state copy the front end
+# hands to the search.
+SCALING_OPERATIONS = [
+    ('move generation', lambda state: state.get_valid_moves(AI)),
+    ('evaluation', evaluate),
+    ('make+unmake', lambda state: make_unmake(state, AI)),
+    ('game over check', lambda state: state.game_over()),
+    ('snapshot copy', lambda state: state.copy()),
+]
+
+
+FLAG_GROWTH = 2.0
+
+
+def bench_scaling(sizes, depth):
+    # Costs are per call in microseconds. An operation is flagged when it costs
+    # at least FLAG_GROWTH times more on the largest grid than on the smallest;
+    # O(1) work stays within cache-effect noise of that.
+    rows = []
+    for size in sizes:
+        state = random_position(size, plies=200, width=size, height=size)
+        row = {'size': size, 'cells': size * size}
+        for name, operation in SCALING_OPERATIONS:
+            row[name] = time_per_call(lambda: operation(state)) * 1e6
+        row['search node'] = search_node_cost(state, depth) * 1e6
+        row['memory'] = state_memory(size, size)
+        rows.append(row)
+
+    names = [name for name, _ in SCALING_OPERATIONS] + ['search node']
+    print(f"{'grid':>11} " + " ".join(f"{name:>16}" for name in names) + f" {'bytes/state':>12}")
+    for row in rows:
+        print(f"{row['size']:>5}x{row['size']:<5} " + " ".join(f"{row[name]:>14.2f}us" for name in names)
+              + f" {row['memory']:>12,}")
+
+    flagged = []
+    if len(rows) > 1:
+        first, last = rows[0], rows[-1]
+        cell_ratio = math.log(last['cells'] / first['cells'])
+        for name in names:
+            growth = last[name] / first[name]
+            if growth >= FLAG_GROWTH:
+                flagged.append(name)
+                exponent = math.log(growth) / cell_ratio
+                print(f"FLAG: {name} is {growth:.1f}x slower on {last['size']}x{last['size']} "
+                      f"(~(W*H)^{exponent:.2f}); still O(W*H) per move")
+        print(f"memory per state: {last['memory'] / last['cells']:.2f} bytes/cell on the largest grid")
+    if not flagged:
+        print("No per-move operation grows with board size.")
+    return flagged
+
+
+def bench_parallel(states, depth, worker_counts):
+    # Fixed-depth searches of the same positions, serial vs root splitting
+    # over each worker count, both sides to move and both with fresh
+    # transposition tables; every parallel move must match the serial one
+    from parallel_search import ParallelSearch
+
+    def run(search):
+        moves = []
+        stats = SearchStats()
+        start = time.perf_counter()
+        for state in states:
+            for side in (AI, PLAYER):
+                moves.append(search(state, side, depth, stats, TranspositionTable(), ordering=MoveOrdering()))
+        return moves, stats.nodes, time.perf_counter() - start
+
+    serial_moves, serial_nodes, serial_time = run(get_best_move)
+    print(f"{len(serial_moves)} searches at depth {depth} ({multiprocessing.cpu_count()} cores available)")
+    print(f"{'workers':>7} {'time':>8} {'speedup':>8} {'nodes':>10} {'same move':>10}")
+    print(f"{'serial':>7} {serial_time:>7.2f}s {1:>7.2f}x {serial_nodes:>10,} {'':>10}")
+    for workers in worker_counts:
+        searcher = ParallelSearch(workers)
+        try:
+            moves, nodes, elapsed = run(searcher.get_best_move)
+        finally:
+            searcher.shutdown()
+        same = sum(a == b for a, b in zip(moves, serial_moves))
+        print(f"{workers:>7} {elapsed:>7.2f}s {serial_time / elapsed:>7.2f}x {nodes:>10,} "
+              f"{same:>4}/{len(moves)}")
+        assert same == len(moves), "parallel search picked a different move"
+
+
+def bench_evaluate(states, depth):
+    # Batch vs scalar evaluation of the same positions (results must be
+    # identical), then the search with and without batched leaves
+    import board_ops
+
+    for state in states:
+        for _ in range(3):
+            state.spawn_power_up()
+    start = time.perf_counter()
+    scalar = [evaluate(state) for state in states]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = board_ops.evaluate_states(states).tolist()
+    batch_time = time.perf_counter() - start
+    assert batch == scalar, "evaluate_states differs from evaluate"
+    print(f"evaluate {len(states)} positions: scalar {scalar_time * 1e6 / len(states):.2f} us/position, "
+          f"batch {batch_time * 1e6 / len(states):.2f} us/position ({scalar_time / batch_time:.1f}x)")
+
+    for state in states[:5]:
+        for side in (AI, PLAYER):
+            indices = [index for index in range(len(state.cells)) if state.tables['kinds'][index]]
+            scalar_squares = [evaluate_square(state, index, side) for index in indices]
+            assert board_ops.evaluate_squares(state, indices, side).tolist() == scalar_squares
+            whole_board = board_ops.square_scores(state, side).ravel().tolist()
+            assert [whole_board[index] for index in indices] == scalar_squares, \
+                "square_scores differs from evaluate_square"
+            playable = set(indices)
+            assert not any(value for index, value in enumerate(whole_board) if index not in playable), \
+                "square_scores has a non-zero wall cell"
+
+    rows = []
+    for batch_leaves in (False, True):
+        stats = SearchStats()
+        stats.batch_leaves = batch_leaves
+        moves = [get_best_move(state, side, depth, stats, TranspositionTable(), ordering=MoveOrdering())
+                 for state in states[:50] for side in (AI, PLAYER)]
+        rows.append((batch_leaves, stats, moves))
+        print(f"search, {'batched' if batch_leaves else 'scalar'} leaves: {stats.nodes:,} nodes in "
+              f"{stats.elapsed:.3f}s ({stats.nodes_per_second():,.0f} nodes/s)")
+    assert rows[0][2] == rows[1][2] and rows[0][1].nodes == rows[1][1].nodes, "batched leaves changed the search"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine benchmarks")
+    subparsers = parser.add_subparsers(dest='command')
+    search_parser = subparsers.add_parser('search', help="search nodes/sec, old vs new")
+    search_parser.add_argument('--positions', type=int, default=50)
+    search_parser.add_argument('--depth', type=int, default=4)
+    search_parser.add_argument('--size', type=int, default=GRID_WIDTH, help="grid width and height")
+    ordering_parser = subparsers.add_parser('ordering', help="pruning with and without move ordering")
+    ordering_parser.add_argument('--positions', type=int, default=50)
+    ordering_parser.add_argument('--depth', type=int, default=6)
+    movegen_parser = subparsers.add_parser('movegen', help="per-call cost of move generation and evaluation")
+    movegen_parser.add_argument('--positions', type=int, default=20)
+    powerups_parser = subparsers.add_parser('powerups', help="power-up pickup and spawn cost")
+    powerups_parser.add_argument('--counts', default='5,50,500,5000', help="comma-separated power-up counts")
+    powerups_parser.add_argument('--size', type=int, default=100, help="grid width and height")
+    scaling_parser = subparsers.add_parser('scaling', help="per-operation cost as the grid grows")
+    scaling_parser.add_argument('--sizes', default='15,100,300,1000', help="comma-separated grid sizes")
+    scaling_parser.add_argument('--depth', type=int, default=4)
+    parallel_parser = subparsers.add_parser('parallel', help="root-splitting search speedup vs workers")
+    parallel_parser.add_argument('--positions', type=int, default=20)
+    parallel_parser.add_argument('--depth', type=int, default=10)
+    parallel_parser.add_argument('--workers', default='1,2,3', help="comma-separated worker counts")
+    evaluate_parser = subparsers.add_parser('evaluate', help="NumPy batch evaluation vs scalar")
+    evaluate_parser.add_argument('--positions', type=int, default=2000)
+    evaluate_parser.add_argument('--depth', type=int, default=5, help="search depth for the leaf comparison")
+    evaluate_parser.add_argument('--size', type=int, default=GRID_WIDTH, help="grid width and height")
+    args = parser.parse_args()
+
+    if args.command == 'scaling':
+        bench_scaling([int(size) for size in args.sizes.split(',')], args.depth)
+    elif args.command == 'search':
+        bench_search_speed(args)
+    elif args.command == 'powerups':
+        bench_powerups([int(count) for count in args.counts.split(',')], args.size)
+    elif args.command == 'movegen':
+        bench_movegen([random_position(seed) for seed in range(args.positions)])
+    elif args.command == 'evaluate':
+        bench_evaluate([random_position(seed, width=args.size, height=args.size) for seed in range(args.positions)],
+                       args.depth)
+    elif args.command == 'parallel':
+        bench_parallel([random_position(seed) for seed in range(args.positions)], args.depth,
+                       [int(workers) for workers in args.workers.split(',')])
+    elif args.command == 'ordering':
+        bench_ordering([random_position(seed) for seed in range(args.positions)], args.depth)
+    else:
+        parser.print_help()
+
+
+def bench_search_speed(args):
+    states = [random_position(seed, width=args.size, height=args.size) for seed in range(args.positions)]
+    check_board_ops(states)
+    check_make_unmake()
+    nodes, elapsed = bench_legacy([state.copy() for state in states], args.depth)
+    print(f"copy-per-node search: {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:,.0f} nodes/s)")
+    nodes, elapsed = bench_search(states, args.depth)
+    print(f"make/unmake search:   {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:,.0f} nodes/s)")
+    tt = TranspositionTable()
+    nodes, elapsed = bench_search(states, args.depth, tt)
+    print(f"with transposition table: {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:,.0f} nodes/s), "
+          f"hit rate {tt.hit_rate():.1%} of {tt.probes} probes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import numpy as np
+
+from game_state import AI, BONUS_POINTS, BONUS_POWER_UP, EMPTY, FREEZE_POWER_UP, PLAYER
+import search
+
+# Whole-board NumPy operations over GameState.cells. The arrays are views of
+# the state's bytearray, so nothing is copied and they always reflect the
+# current board. Kept out of game_state so the core rules import without
+# NumPy.
+
+
+def as_array(state):
+    # (height, width) int8 view of the board; writes go straight to the state
+    return np.frombuffer(state.cells, dtype=np.int8).reshape(state.height, state.width)
+
+
+def playable_mask(height, width):
+    mask = np.zeros((height, width), dtype=bool)
+    mask[1:-1, 1:-1] = True
+    return mask
+
+
+def tile_counts(state):
+    # Recount tiles per owner from scratch: [empty playable, player, ai]
+    # (or one entry per agent). GameState.counts keeps the same numbers up
+    # to date move by move.
+    board = as_array(state)
+    return [int(count) for count in np.bincount(board[1:-1, 1:-1].ravel(), minlength=state.agents + 1)]
+
+
+def adjacency_counts(state, owner):
+    # For every cell, how many of its four neighbours belong to owner
+    # (shifted copies of the ownership mask, summed)
+    mine = (as_array(state) == owner).astype(np.int8)
+    counts = np.zeros_like(mine)
+    counts[1:, :] += mine[:-1, :]
+    counts[:-1, :] += mine[1:, :]
+    counts[:, 1:] += mine[:, :-1]
+    counts[:, :-1] += mine[:, 1:]
+    return counts
+
+
+# --- Batch evaluation. Each function returns exactly what the scalar
+# search.evaluate_square / search.evaluate give for the same inputs. ---
+
+def square_scores(state, side):
+    # evaluate_square(state, cell, side) for every cell at once, as a
+    # (height, width) int array; wall cells are 0
+    enemy = AI if side == PLAYER else PLAYER
+    board = as_array(state)
+    power = np.frombuffer(state.power_grid, dtype=np.int8).reshape(state.height, state.width)
+    scores = _square_terms(board, power, enemy) + search.ADJACENT_ENEMY_WEIGHT * adjacency_counts(state, enemy)
+    scores[~playable_mask(state.height, state.width)] = 0
+    return scores
+
+
+def evaluate_squares(state, indices, side):
+    # evaluate_square for an array of playable cell indices
+    indices = np.asarray(indices, dtype=np.intp)
+    cells = np.frombuffer(state.cells, dtype=np.int8)
+    power = np.frombuffer(state.power_grid, dtype=np.int8)
+    return _square_scores(lambda cell: cells[cell], lambda cell: power[cell], indices,
+                          np.array(state.tables['adjacent']), AI if side == PLAYER else PLAYER)
+
+
+def _square_scores(tile_at, power_at, squares, adjacent, enemy):
+    # The evaluate_square formula over an array of squares; tile_at and
+    # power_at look cells up (and may patch in a move not on the board)
+    adjacent_enemies = (tile_at(squares[..., None] + adjacent) == enemy).sum(axis=-1)
+    return _square_terms(tile_at(squares), power_at(squares), enemy) + search.ADJACENT_ENEMY_WEIGHT * adjacent_enemies
+
+
+def _square_terms(tiles, power, enemy):
+    # The tile and power-up part of evaluate_square, with the current weights
+    return (search.ENEMY_TILE_WEIGHT * (tiles == enemy) + search.EMPTY_TILE_WEIGHT * (tiles == EMPTY)
+            + search.BONUS_WEIGHT * (power == BONUS_POWER_UP) + search.FREEZE_WEIGHT * (power == FREEZE_POWER_UP))
+
+
+def per_row(values, cells):
+    # values (one per row) shaped to broadcast against a cells array
+    return values.reshape((-1,) + (1,) * (cells.ndim - 1))
+
+
+def _best_squares(tile_at, power_at, kinds, origins, blocked, adjacent, side, size):
+    # best_square for one piece per row: origins and blocked are arrays of
+    # cell indices; returns 0 for a row with no legal square
+    squares = origins[..., None] + adjacent
+    valid = ((kinds[origins][..., None] >> np.arange(len(adjacent))) & 1).astype(bool)
+    valid &= squares != blocked[..., None]
+    # Off-board neighbours of wall squares are never used; keep them in range
+    safe = np.where(valid, squares, origins[..., None])
+    scores = _square_scores(tile_at, power_at, np.clip(safe, 0, size - 1), adjacent,
+                            AI if side == PLAYER else PLAYER)
+    best = np.where(valid, scores, scores.min() - 1).max(axis=-1)
+    return np.where(valid.any(axis=-1), best, 0)
+
+
+def evaluate_states(states):
+    # search.evaluate for a list of states of one grid size, as an array
+    first = states[0]
+    size = first.width * first.height
+    cells = np.frombuffer(b''.join(state.cells for state in states), dtype=np.int8).reshape(len(states), size)
+    power = np.frombuffer(b''.join(state.power_grid for state in states), dtype=np.int8).reshape(len(states), size)
+    pieces = np.array([state.piece_cells[1:] for state in states], dtype=np.intp)
+    scores = np.array([state.scores[1:] for state in states], dtype=np.int64)
+    rows = np.arange(len(states))
+    kinds = np.frombuffer(first.tables['kinds'], dtype=np.uint8)
+    adjacent = np.array(first.tables['adjacent'])
+
+    def tile_at(cell):
+        return cells[per_row(rows, cell), cell]
+
+    def power_at(cell):
+        return power[per_row(rows, cell), cell]
+
+    ai = _best_squares(tile_at, power_at, kinds, pieces[:, 1], pieces[:, 0], adjacent, AI, size)
+    player = _best_squares(tile_at, power_at, kinds, pieces[:, 0], pieces[:, 1], adjacent, PLAYER, size)
+    return search.MATERIAL_WEIGHT * (scores[:, 1] - scores[:, 0]) + ai - player
+
+
+def evaluate_children(state, side, moves):
+    # search.evaluate of the position after each of side's moves (cell
+    # indices), in one batch and without touching the board
+    targets = np.array(moves, dtype=np.intp)
+    cells = np.frombuffer(state.cells, dtype=np.int8)
+    power = np.frombuffer(state.power_grid, dtype=np.int8)
+    enemy = AI if side == PLAYER else PLAYER
+    size = state.width * state.height
+    kinds = np.frombuffer(state.tables['kinds'], dtype=np.uint8)
+    adjacent = np.array(state.tables['adjacent'])
+    # One row per child; the moved-to cell becomes side's and loses its power-up
+
+    def tile_at(cell):
+        return np.where(cell == per_row(targets, cell), side, cells[cell])
+
+    def power_at(cell):
+        return np.where(cell == per_row(targets, cell), 0, power[cell])
+
+    previous = cells[targets]
+    picked = power[targets]
+    own = state.scores[side] + (previous != side) + BONUS_POINTS * (picked == BONUS_POWER_UP)
+    other = state.scores[enemy] - (previous == enemy)
+    other_cells = np.full(len(targets), state.piece_cells[enemy], dtype=np.intp)
+    mover = _best_squares(tile_at, power_at, kinds, targets, other_cells, adjacent, side, size)
+    opponent = _best_squares(tile_at, power_at, kinds, other_cells, targets, adjacent, enemy, size)
+    if side == AI:
+        return search.MATERIAL_WEIGHT * (own - other) + mover - opponent
+    return search.MATERIAL_WEIGHT * (other - own) + opponent - mover
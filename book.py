@@ -0,0 +1,150 @@
+import argparse
+import mmap
+import struct
+import time
+
+from game_state import PLAYER, GameConfig, other_side
+from search import MoveOrdering, SearchStats, TranspositionTable, get_best_move
+
+# Opening book. Every game starts from the same position, so the first
+# plies are searched offline once, deeply, and stored as a sorted table of
+# (position key, move) records. At startup the file is memory-mapped and
+# looked up with a binary search, so a book move costs a few microseconds
+# and no search time.
+#   python book.py --plies 6 --depth 8            - build opening.book
+#   python book.py --check opening.book           - print what is in a book
+
+BOOK_PATH = 'opening.book'
+BOOK_MAGIC = b'TVBK'
+BOOK_VERSION = 1
+# magic, version, width, height, plies, search depth, record count
+HEADER = struct.Struct('<4sBHHBBI')
+# position_key(side to move), move x, move y; sorted by key
+RECORD = struct.Struct('<QHH')
+
+
+def build_book(config, plies, depth, progress=None):
+    # Search every position reachable in the first plies of a game (players
+    # alternate, the player first, no power-ups) and return {key: move}
+    book = {}
+    tt = TranspositionTable(20)
+    ordering = MoveOrdering()
+    frontier = [config.new_game()]
+    side = PLAYER
+    for ply in range(plies):
+        next_frontier = []
+        for state in frontier:
+            key = state.position_key(side)
+            if key in book:
+                continue
+            search_depth = min(depth, config.game_ticks - ply)
+            book[key] = get_best_move(state, side, search_depth, SearchStats(), tt, ordering=ordering)
+            for move in state.get_valid_moves(side):
+                child = state.copy()
+                child.play_move(move, side)
+                next_frontier.append(child)
+        if progress:
+            progress(ply, len(book))
+        frontier = next_frontier
+        side = other_side(side)
+    return book
+
+
+def write_book(path, book, config, plies, depth):
+    records = sorted((key, move) for key, move in book.items() if move is not None)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, config.width, config.height, plies, depth, len(records)))
+        for key, (x, y) in records:
+            f.write(RECORD.pack(key, x, y))
+    return len(records)
+
+
+class OpeningBook:
+    # Read-only, memory-mapped book. lookup() returns the book move for the
+    # side to move, or None when the position is not in the book.
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.plies, self.depth, self.count = HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+        if len(self.data) < HEADER.size + self.count * RECORD.size:
+            raise ValueError(f"{path} is truncated")
+        self.hits = 0
+
+    def close(self):
+        self.data.close()
+
+    def key_at(self, slot):
+        return struct.unpack_from('<Q', self.data, HEADER.size + slot * RECORD.size)[0]
+
+    def lookup(self, state, side):
+        if state.width != self.width or state.height != self.height:
+            return None
+        key = state.position_key(side)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self.key_at(low) != key:
+            return None
+        _, x, y = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+        # A hash collision must never produce an illegal move
+        if (x, y) not in state.get_valid_moves(side):
+            return None
+        self.hits += 1
+        return (x, y)
+
+
+def load_book(path):
+    # The book at path, or None if there is no usable book there
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the opening book")
+    parser.add_argument('--plies', type=int, default=6, help="plies from the start position to cover")
+    parser.add_argument('--depth', type=int, default=8, help="search depth for every book position")
+    parser.add_argument('--out', default=BOOK_PATH)
+    parser.add_argument('--check', metavar='BOOK', default=None, help="print a book's header and first moves")
+    GameConfig.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.check:
+        book = OpeningBook(args.check)
+        config = GameConfig(book.width, book.height)
+        print(f"{book.count} positions, {book.width}x{book.height}, {book.plies} plies at depth {book.depth}")
+        state = config.new_game()
+        side = PLAYER
+        line = []
+        for _ in range(book.plies):
+            move = book.lookup(state, side)
+            if move is None:
+                break
+            line.append(move)
+            state.play_move(move, side)
+            side = other_side(side)
+        print(f"main line: {line}")
+        return
+
+    config = GameConfig.from_args(args)
+    start = time.perf_counter()
+
+    def progress(ply, positions):
+        print(f"ply {ply + 1}: {positions} positions ({time.perf_counter() - start:.1f}s)")
+
+    book = build_book(config, args.plies, args.depth, progress)
+    count = write_book(args.out, book, config, args.plies, args.depth)
+    print(f"wrote {count} positions to {args.out} ({HEADER.size + count * RECORD.size} bytes) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,433 +1,202 @@
-import pygame
-import random
 import time
 
-# Initialize pygame
-pygame.init()
+# Launch time, for the time-to-first-frame report (taken before pygame is imported)
+LAUNCH_TIME = time.perf_counter()
+
+import argparse
+import os
+import pygame
 
-# Set up display
+from ai_worker import AIWorker
+from book import BOOK_PATH
+from profiling import FrameProfiler
+from game_state import AI, AI_MOVE_DELAY, FPS, GAME_DURATION, PLAYER, GameConfig, other_side
+from renderer import BLACK, PINK, PURPLE, SCORE_PANEL_WIDTH, WHITE, Renderer
+from replay import EventLog
+from search import WEIGHTS_PATH
+
+# Nothing is initialized at import: open_window() starts only the display
+# and font modules, fonts are created on first use, and the music starts
+# after the first frame is on screen. --headless starts no pygame module.
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Territory Vonquest")
-
-# Colors
-PINK = (255, 182, 193)
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)  # Human player color
-PURPLE = (128, 0, 128)  # AI color
-GREEN = (0, 255, 0)  # AI2 color (AI vs AI)
-YELLOW = (255, 255, 0)  # Power-up color
-RED = (255, 0, 0)  # Freeze power-up color
-BLUE = (0, 0, 255)  # Bonus power-up color
-
-# Fonts
-font = pygame.font.SysFont(None, 40)
-small_font = pygame.font.SysFont(None, 30)
-
-# Try to load background music, but continue if file not found
-try:
-    pygame.mixer.music.load("background.mp3")
-    pygame.mixer.music.play(-1, 0.0)
-except:
-    print("Background music file not found. Game will continue without music.")
-
-# Tile settings
+screen = None
+headless = False
+MUSIC_PATH = "background.mp3"
+music_started = False
+_fonts = {}  # Size -> Font, created once
+first_frames = {}  # Label -> ms from launch until that frame was shown
+SCOREBOARD_SECONDS = 5
+HEADLESS_POLL_INTERVAL = 0.001  # Seconds between checks on the AI worker without a frame loop
+# The window was uncovered or restored; frames only push changed rects, so
+# the rest of the screen has to be pushed again
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE)
+
+# Tile settings; configure() shrinks tiles to fit bigger grids on screen
 TILE_SIZE = 40
-SCORE_PANEL_WIDTH = 200  # Width of the score panel
 GRID_WIDTH = (WIDTH - SCORE_PANEL_WIDTH) // TILE_SIZE  # Adjust grid width to account for score panel
 GRID_HEIGHT = HEIGHT // TILE_SIZE
+MAX_WINDOW_WIDTH, MAX_WINDOW_HEIGHT = 1400, 1000
 
 # Timer and game state variables
 start_time = time.time()
-game_duration = 30  # Changed to 30 seconds
-player_score = 0
-ai_score = 0
-turn = 'player'  # 'player' or 'ai'
-power_ups = []
-power_up_types = {}  # Store power-up types for each position
-freeze_active = False
-freeze_start_time = 0
-FREEZE_DURATION = 3  # 3 seconds freeze duration
+game_duration = GAME_DURATION
 game_mode = None  # 'human_vs_ai' or 'ai_vs_ai'
 ai_move_timer = 0
-AI_MOVE_DELAY = 0.5  # AI moves every 0.5 seconds
-
-# Player positions
-player_pos = [GRID_WIDTH // 4, GRID_HEIGHT // 2]  # Start on the left side
-ai_pos = [(GRID_WIDTH * 3) // 4, GRID_HEIGHT // 2]  # Start on the right side
-
-# Initialize board (2D grid)
-board = [['' for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-
-# Power-up types
-POWER_UPS = ['freeze', 'bonus']
-
-def get_valid_moves(pos):
-    moves = []
-    for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-        new_x = pos[0] + dx
-        new_y = pos[1] + dy
-        # Strict boundary checking - ensure we're at least 1 tile away from the edges
-        if 1 <= new_x < GRID_WIDTH - 1 and 1 <= new_y < GRID_HEIGHT - 1:
-            # Check if the move is not blocked by the other player
-            if (new_x != ai_pos[0] or new_y != ai_pos[1]) and (new_x != player_pos[0] or new_y != player_pos[1]):
-                moves.append((new_x, new_y))
-    return moves
-
-def evaluate_position(pos, is_ai=True):
-    score = 0
-    # Check the tile at the position
-    if board[pos[1]][pos[0]] == 'player' and is_ai:
-        score += 3  # Higher score for capturing player tiles
-    elif board[pos[1]][pos[0]] == 'ai' and not is_ai:
-        score += 3  # Higher score for capturing AI tiles
-    elif board[pos[1]][pos[0]] == '':
-        score += 1  # Basic score for empty tiles
-    
-    # Check for power-ups
-    if (pos[1], pos[0]) in power_ups:
-        power_type = power_up_types[(pos[1], pos[0])]
-        if power_type == 'bonus':
-            score += 2  # Bonus power-up is good
-        elif power_type == 'freeze':
-            score -= 2  # Avoid freeze power-ups
-    
-    # Check surrounding tiles for strategic value
-    for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-        new_x = pos[0] + dx
-        new_y = pos[1] + dy
-        if 0 <= new_x < GRID_WIDTH and 0 <= new_y < GRID_HEIGHT:
-            if is_ai and board[new_y][new_x] == 'player':
-                score += 1  # Bonus for being near player tiles
-            elif not is_ai and board[new_y][new_x] == 'ai':
-                score += 1  # Bonus for being near AI tiles
-    
-    return score
 
-def minimax(pos, depth, alpha, beta, is_ai=True):
-    if depth == 0:
-        return evaluate_position(pos, is_ai)
-    
-    valid_moves = get_valid_moves(pos)
-    if not valid_moves:
-        return evaluate_position(pos, is_ai)
-    
-    if is_ai:
-        max_eval = float('-inf')
-        for move in valid_moves:
-            # Simulate move
-            new_x, new_y = move
-            old_board = [row[:] for row in board]
-            old_ai_score = ai_score
-            old_player_score = player_score
-            
-            # Make move
-            if board[new_y][new_x] != 'ai':
-                if board[new_y][new_x] == 'player':
-                    player_score -= 1
-                board[new_y][new_x] = 'ai'
-                ai_score += 1
-            
-            # Recursive evaluation
-            eval = minimax([new_x, new_y], depth - 1, alpha, beta, False)
-            
-            # Restore state
-            board = [row[:] for row in old_board]
-            ai_score = old_ai_score
-            player_score = old_player_score
-            
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
+# All rules and game data live in the headless GameState; this module only
+# draws it and feeds it input
+config = GameConfig()
+state = config.new_game()
+
+# The AI thinks in a background worker on a snapshot of the state while the
+# frame loop keeps running. A search may use most of the time left until
+# its move is due; any change to the state cancels it.
+SEARCH_BUDGET_SHARE = 0.8
+MIN_SEARCH_BUDGET_MS = 5
+ai_worker = None
+state_version = 0  # Bumped whenever the state changes under a running search
+ai_result = None  # (side, move, stats) found for the current state version
+
+# Seeded mode (--seed): power-ups spawn once per tick from the seeded game
+# RNG and the AI searches to a fixed depth instead of a time budget, so an
+# AI-vs-AI game plays out the same on every machine. --record writes the
+# game's events to a log that replay.py can re-simulate.
+game_seed = None
+SEEDED_AI_DEPTH = 4
+record_path = None
+
+# --profile: per-frame stage timings and search counters, shown in the score
+# panel; --profile-out also writes them to a CSV or JSON file at the end
+profiler = None
+profile_path = None
+
+# Opening book the AI answers the first plies from (see book.py); ignored
+# when the file does not exist or was built for another grid size
+book_path = BOOK_PATH
+
+# Processes the AI splits its root moves over (0: one search process)
+search_workers = 0
+
+# Evaluation weights written by tune.py; the built-in defaults are used when
+# the file does not exist
+weights_path = WEIGHTS_PATH
+
+def configure(new_config):
+    # Apply runtime settings: grid size, game length and move delay
+    global config, screen, WIDTH, HEIGHT, TILE_SIZE, GRID_WIDTH, GRID_HEIGHT
+    global game_duration, AI_MOVE_DELAY, state
+    config = new_config
+    GRID_WIDTH, GRID_HEIGHT = config.width, config.height
+    TILE_SIZE = max(1, min(40, (MAX_WINDOW_WIDTH - SCORE_PANEL_WIDTH) // GRID_WIDTH,
+                           MAX_WINDOW_HEIGHT // GRID_HEIGHT))
+    WIDTH = GRID_WIDTH * TILE_SIZE + SCORE_PANEL_WIDTH
+    HEIGHT = max(600, GRID_HEIGHT * TILE_SIZE)
+    if screen is not None:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    game_duration = config.duration
+    AI_MOVE_DELAY = config.move_delay
+    state = config.new_game()
+
+def open_window():
+    global screen
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Territory Vonquest")
+
+def get_font(size):
+    # pygame's built-in font, which is what SysFont(None, size) returns,
+    # without SysFont's scan of every font installed on the system
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+def start_music():
+    # Once, and only after the first frame is up: opening the audio device
+    # is slow
+    global music_started
+    if music_started:
+        return
+    music_started = True
+    if not os.path.exists(MUSIC_PATH):
+        print("Background music file not found. Game will continue without music.")
+        return
+    try:
+        pygame.mixer.init()
+        pygame.mixer.music.load(MUSIC_PATH)
+        pygame.mixer.music.play(-1, 0.0)
+    except pygame.error as error:
+        print(f"Background music unavailable ({error}). Game will continue without music.")
+
+def first_frame(label):
+    # Note how long after launch the first frame of a kind was shown (or,
+    # headless, the first tick was played)
+    if label not in first_frames:
+        first_frames[label] = (time.perf_counter() - LAUNCH_TIME) * 1000
+        print(f"time to first {label}: {first_frames[label]:.0f} ms")
+        if profiler:
+            profiler.startup[label] = round(first_frames[label], 1)
+
+def ai_side():
+    # The side the AI plays on this tick
+    return state.turn if game_mode == 'ai_vs_ai' else AI
+
+def start_ai_search():
+    max_depth = max(1, config.game_ticks - state.tick)
+    if game_seed is not None:
+        budget_ms = float('inf')
+        max_depth = min(max_depth, SEEDED_AI_DEPTH)
     else:
-        min_eval = float('inf')
-        for move in valid_moves:
-            # Simulate move
-            new_x, new_y = move
-            old_board = [row[:] for row in board]
-            old_ai_score = ai_score
-            old_player_score = player_score
-            
-            # Make move
-            if board[new_y][new_x] != 'player':
-                if board[new_y][new_x] == 'ai':
-                    ai_score -= 1
-                board[new_y][new_x] = 'player'
-                player_score += 1
-            
-            # Recursive evaluation
-            eval = minimax([new_x, new_y], depth - 1, alpha, beta, True)
-            
-            # Restore state
-            board = [row[:] for row in old_board]
-            ai_score = old_ai_score
-            player_score = old_player_score
-            
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
+        time_left = ai_move_timer + AI_MOVE_DELAY - time.time()
+        budget_ms = max(MIN_SEARCH_BUDGET_MS, time_left * 1000 * SEARCH_BUDGET_SHARE)
+    ai_worker.start(state, ai_side(), budget_ms, max_depth, state_version)
 
-def get_best_move(pos, is_ai=True, depth=2):  # Reduced depth to 2 for better performance
-    best_score = float('-inf') if is_ai else float('inf')
-    best_move = None
-    alpha = float('-inf')
-    beta = float('inf')
-    
-    valid_moves = get_valid_moves(pos)
-    if not valid_moves:
-        return None
-    
-    for move in valid_moves:
-        # Simulate move
-        new_x, new_y = move
-        old_board = [row[:] for row in board]
-        old_ai_score = ai_score
-        old_player_score = player_score
-        
-        # Make move
-        if is_ai:
-            if board[new_y][new_x] != 'ai':
-                if board[new_y][new_x] == 'player':
-                    player_score -= 1
-                board[new_y][new_x] = 'ai'
-                ai_score += 1
-        else:
-            if board[new_y][new_x] != 'player':
-                if board[new_y][new_x] == 'ai':
-                    ai_score -= 1
-                board[new_y][new_x] = 'player'
-                player_score += 1
-        
-        # Evaluate move
-        score = minimax([new_x, new_y], depth - 1, alpha, beta, not is_ai)
-        
-        # Restore state
-        board = [row[:] for row in old_board]
-        ai_score = old_ai_score
-        player_score = old_player_score
-        
-        if is_ai:
-            if score > best_score:
-                best_score = score
-                best_move = move
-            alpha = max(alpha, best_score)
-        else:
-            if score < best_score:
-                best_score = score
-                best_move = move
-            beta = min(beta, best_score)
-    
-    return best_move
+def state_changed():
+    # Anything the AI was thinking about is out of date now
+    global state_version, ai_result
+    state_version += 1
+    ai_result = None
+    ai_worker.cancel()
 
 def move_ai():
-    global ai_pos, ai_score, player_score
-    if not freeze_active:
-        try:
-            best_move = get_best_move(ai_pos, True, 2)  # Reduced depth to 2
-            if best_move:
-                new_x, new_y = best_move
-                # Update position and capture tile
-                ai_pos = [new_x, new_y]
-                if board[new_y][new_x] != 'ai':
-                    if board[new_y][new_x] == 'player':
-                        player_score -= 1  # Deduct from player's score
-                    board[new_y][new_x] = 'ai'
-                    ai_score += 1
-                # Check for power-up
-                if (new_y, new_x) in power_ups:
-                    handle_power_up(new_y, new_x)
-        except Exception as e:
-            print(f"Error in AI move: {e}")
-            # Fallback to simple movement if minimax fails
-            valid_moves = get_valid_moves(ai_pos)
-            if valid_moves:
-                new_x, new_y = random.choice(valid_moves)
-                ai_pos = [new_x, new_y]
-                if board[new_y][new_x] != 'ai':
-                    if board[new_y][new_x] == 'player':
-                        player_score -= 1
-                    board[new_y][new_x] = 'ai'
-                    ai_score += 1
-
-def move_player_ai():
-    global player_pos, player_score, ai_score
-    if not freeze_active:
-        try:
-            best_move = get_best_move(player_pos, False, 2)  # Reduced depth to 2
-            if best_move:
-                new_x, new_y = best_move
-                # Update position and capture tile
-                player_pos = [new_x, new_y]
-                if board[new_y][new_x] != 'player':
-                    if board[new_y][new_x] == 'ai':
-                        ai_score -= 1  # Deduct from AI's score
-                    board[new_y][new_x] = 'player'
-                    player_score += 1
-                # Check for power-up
-                if (new_y, new_x) in power_ups:
-                    handle_power_up(new_y, new_x)
-        except Exception as e:
-            print(f"Error in player AI move: {e}")
-            # Fallback to simple movement if minimax fails
-            valid_moves = get_valid_moves(player_pos)
-            if valid_moves:
-                new_x, new_y = random.choice(valid_moves)
-                player_pos = [new_x, new_y]
-                if board[new_y][new_x] != 'player':
-                    if board[new_y][new_x] == 'ai':
-                        ai_score -= 1
-                    board[new_y][new_x] = 'player'
-                    player_score += 1
+    # Play the move the worker found (if any) and hand the turn over
+    if not state.frozen():
+        side, best_move, _ = ai_result
+        if best_move:
+            state.play_move(best_move, side)
+    if game_mode == 'ai_vs_ai':
+        state.turn = other_side(state.turn)
+    state_changed()
 
 def move_player(dx, dy):
-    global player_pos, player_score, ai_score
-    new_x = player_pos[0] + dx
-    new_y = player_pos[1] + dy
-    
-    # Strict boundary checking - ensure we're at least 1 tile away from the edges
-    if (1 <= new_x < GRID_WIDTH - 1 and 1 <= new_y < GRID_HEIGHT - 1 and 
-        (new_x != ai_pos[0] or new_y != ai_pos[1])):
-        player_pos = [new_x, new_y]
-        # Check if there's a power-up at the new position
-        if (new_y, new_x) in power_ups:
-            handle_power_up(new_y, new_x)
-        # Update score and capture tile
-        if board[new_y][new_x] != 'player':
-            if board[new_y][new_x] == 'ai':
-                ai_score -= 1  # Deduct from AI's score
-            board[new_y][new_x] = 'player'
-            player_score += 1
-
-def handle_power_up(row, col):
-    global freeze_active, freeze_start_time, player_score, ai_score
-    if (row, col) in power_ups:
-        power_type = power_up_types[(row, col)]
-        if power_type == 'freeze':
-            freeze_active = True
-            freeze_start_time = time.time()
-            power_ups.remove((row, col))
-            del power_up_types[(row, col)]
-        elif power_type == 'bonus':
-            if turn == 'player':
-                player_score += 5
-            else:
-                ai_score += 5
-            power_ups.remove((row, col))
-            del power_up_types[(row, col)]
-
-def draw_power_up(surface, x, y, power_type):
-    center_x = x * TILE_SIZE + TILE_SIZE // 2
-    center_y = y * TILE_SIZE + TILE_SIZE // 2
-    if power_type == 'freeze':
-        pygame.draw.circle(surface, RED, (center_x, center_y), TILE_SIZE // 3)
-        pygame.draw.line(surface, WHITE, (center_x - 5, center_y), (center_x + 5, center_y), 2)
-        pygame.draw.line(surface, WHITE, (center_x, center_y - 5), (center_x, center_y + 5), 2)
-    else:  # bonus
-        pygame.draw.rect(surface, BLUE, (center_x - TILE_SIZE // 3, center_y - TILE_SIZE // 3, 
-                                       TILE_SIZE // 1.5, TILE_SIZE // 1.5))
-        pygame.draw.line(surface, WHITE, (center_x - 5, center_y), (center_x + 5, center_y), 2)
-
-def draw_grid():
-    # Draw the grid background and captured tiles
-    for row in range(GRID_HEIGHT):
-        for col in range(GRID_WIDTH):
-            rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-            # Draw walls
-            if row == 0 or row == GRID_HEIGHT - 1 or col == 0 or col == GRID_WIDTH - 1:
-                pygame.draw.rect(screen, (100, 100, 100), rect)  # Dark gray for walls
-                # Draw a thicker border for walls
-                pygame.draw.rect(screen, (50, 50, 50), rect, 3)  # Darker border for walls
-            elif board[row][col] == 'player':
-                pygame.draw.rect(screen, BLACK, rect)
-            elif board[row][col] == 'ai':
-                pygame.draw.rect(screen, PURPLE, rect)
-            else:
-                pygame.draw.rect(screen, PINK, rect)
-            # Only draw white border for non-wall tiles
-            if not (row == 0 or row == GRID_HEIGHT - 1 or col == 0 or col == GRID_WIDTH - 1):
-                pygame.draw.rect(screen, WHITE, rect, 2)
-
-    # Draw the player
-    player_rect = pygame.Rect(player_pos[0] * TILE_SIZE, player_pos[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-    pygame.draw.rect(screen, BLACK, player_rect)
-    center_x = player_pos[0] * TILE_SIZE + TILE_SIZE // 2
-    center_y = player_pos[1] * TILE_SIZE + TILE_SIZE // 2
-    pygame.draw.circle(screen, WHITE, (center_x, center_y), TILE_SIZE // 4)
-
-    # Draw the AI
-    ai_rect = pygame.Rect(ai_pos[0] * TILE_SIZE, ai_pos[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-    pygame.draw.rect(screen, PURPLE, ai_rect)
-    center_x = ai_pos[0] * TILE_SIZE + TILE_SIZE // 2
-    center_y = ai_pos[1] * TILE_SIZE + TILE_SIZE // 2
-    pygame.draw.line(screen, WHITE, (center_x - 10, center_y - 10), (center_x + 10, center_y + 10), 2)
-    pygame.draw.line(screen, WHITE, (center_x + 10, center_y - 10), (center_x - 10, center_y + 10), 2)
-
-    # Draw power-ups
-    for pos in power_ups:
-        draw_power_up(screen, pos[1], pos[0], power_up_types[pos])
-
-def draw_scores():
-    # Draw score panel
-    score_panel = pygame.Rect(WIDTH - 200, 0, 200, HEIGHT)
-    pygame.draw.rect(screen, (50, 50, 50), score_panel)
-    
-    # Draw scores
-    player_text = font.render(f"Player: {player_score}", True, WHITE)
-    ai_text = font.render(f"AI: {ai_score}", True, WHITE)
-    screen.blit(player_text, (WIDTH - 180, 20))
-    screen.blit(ai_text, (WIDTH - 180, 60))
-
-    # Draw power-up legend
-    legend_text = font.render("Power-ups:", True, WHITE)
-    screen.blit(legend_text, (WIDTH - 180, 120))
-    
-    # Draw freeze power-up example
-    pygame.draw.circle(screen, RED, (WIDTH - 160, 170), 10)
-    freeze_text = small_font.render("Freeze", True, WHITE)
-    screen.blit(freeze_text, (WIDTH - 140, 165))
-    
-    # Draw bonus power-up example
-    pygame.draw.rect(screen, BLUE, (WIDTH - 170, 190, 20, 20))
-    bonus_text = small_font.render("Bonus", True, WHITE)
-    screen.blit(bonus_text, (WIDTH - 140, 195))
-
-    # Draw controls
-    controls_text = font.render("Controls:", True, WHITE)
-    screen.blit(controls_text, (WIDTH - 180, 250))
-    w_text = small_font.render("W - Move Up", True, WHITE)
-    a_text = small_font.render("A - Move Left", True, WHITE)
-    s_text = small_font.render("S - Move Down", True, WHITE)
-    d_text = small_font.render("D - Move Right", True, WHITE)
-    screen.blit(w_text, (WIDTH - 180, 290))
-    screen.blit(a_text, (WIDTH - 180, 320))
-    screen.blit(s_text, (WIDTH - 180, 350))
-    screen.blit(d_text, (WIDTH - 180, 380))
+    if state.move_player(dx, dy):
+        state_changed()
 
 def display_scoreboard():
+    # Shows the result for SCOREBOARD_SECONDS while still handling events;
+    # a key, a click or closing the window ends it early
     screen.fill(PINK)
     
     # Draw title
-    title_font = pygame.font.SysFont(None, 60)
+    title_font = get_font(60)
     title_text = title_font.render("Game Over!", True, WHITE)
     screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 100))
     
     # Draw scores
-    score_font = pygame.font.SysFont(None, 50)
-    player_text = score_font.render(f"Player Score: {player_score}", True, BLACK)
-    ai_text = score_font.render(f"AI Score: {ai_score}", True, PURPLE)
+    score_font = get_font(50)
+    player_text = score_font.render(f"Player Score: {state.player_score}", True, BLACK)
+    ai_text = score_font.render(f"AI Score: {state.ai_score}", True, PURPLE)
     
     screen.blit(player_text, (WIDTH // 2 - player_text.get_width() // 2, 250))
     screen.blit(ai_text, (WIDTH // 2 - ai_text.get_width() // 2, 320))
     
     # Draw winner
-    winner_font = pygame.font.SysFont(None, 45)
-    if player_score > ai_score:
+    winner_font = get_font(45)
+    winner = state.winner()
+    if winner == PLAYER:
         winner_text = winner_font.render("Player Wins!", True, BLACK)
-    elif ai_score > player_score:
+    elif winner == AI:
         winner_text = winner_font.render("AI Wins!", True, PURPLE)
     else:
         winner_text = winner_font.render("It's a Tie!", True, WHITE)
@@ -435,10 +204,25 @@ def display_scoreboard():
     screen.blit(winner_text, (WIDTH // 2 - winner_text.get_width() // 2, 400))
     
     pygame.display.flip()
-    time.sleep(5)  # Display scoreboard for 5 seconds
+    clock = pygame.time.Clock()
+    shown_until = time.time() + SCOREBOARD_SECONDS
+    while time.time() < shown_until:
+        for event in pygame.event.get():
+            if event.type in (pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                return
+            if event.type in EXPOSE_EVENTS:
+                pygame.display.flip()
+        clock.tick(FPS)
+
+def print_result():
+    # Headless games end with the scores on stdout instead of the scoreboard
+    winner = state.winner()
+    result = "Player wins" if winner == PLAYER else "AI wins" if winner == AI else "Tie"
+    print(f"{result}: player {state.player_score}, AI {state.ai_score} after {state.tick} ticks")
 
 def display_menu():
     global game_mode
+    font = get_font(40)
     while True:
         screen.fill(PINK)
         pygame.draw.rect(screen, WHITE, pygame.Rect(WIDTH // 4, HEIGHT // 3, WIDTH // 2, 50))
@@ -451,6 +235,8 @@ def display_menu():
         screen.blit(menu_text2, (WIDTH // 2 - menu_text2.get_width() // 2, HEIGHT // 2 + 10))
         
         pygame.display.flip()
+        first_frame('menu frame')
+        start_music()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -469,53 +255,58 @@ def display_menu():
                         game_mode = 'ai_vs_ai'
                         return
 
-def game_over(board):
-    return all(board[row][col] != '' for row in range(GRID_HEIGHT) for col in range(GRID_WIDTH))
+def tick_time_left():
+    return max(0, (config.game_ticks - state.tick) * AI_MOVE_DELAY)
 
 def main():
-    global start_time, power_ups, power_up_types, freeze_active, freeze_start_time
-    global game_mode, turn, board, player_score, ai_score, ai_move_timer
+    global start_time, game_mode, state, ai_move_timer, ai_worker, ai_result
     
-    display_menu()  # Show the menu to select game mode
+    if headless:
+        game_mode = 'ai_vs_ai'
+    else:
+        if screen is None:
+            open_window()
+        display_menu()  # Show the menu to select game mode
+    # Without frames to pace it, a headless game runs on the tick count and
+    # the AI moves as soon as its search is done
+    tick_based = game_seed is not None or headless
 
     running = True
-    board = [['' for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-    player_score = 0
-    ai_score = 0
-    turn = 'player'  # human starts
-    power_ups = []
-    power_up_types = {}
-    freeze_active = False
-    freeze_start_time = 0
+    finished = False  # Ran to the end, rather than the window being closed
+    state = config.new_game(game_seed)  # human starts
+    state.track_changes = not headless  # Lets the renderer redraw only changed cells
+    if record_path:
+        state.recorder = EventLog(record_path, state, game_seed, config.game_ticks)
+    renderer = None
+    if not headless:
+        renderer = Renderer(screen, TILE_SIZE, get_font(40), get_font(30))
+        renderer.profiler = profiler
+    ai_worker = AIWorker(book_path=book_path, search_workers=search_workers,
+                         weights_path=weights_path if weights_path and os.path.exists(weights_path) else None)
+    ai_result = None
     ai_move_timer = 0
-    player_pos = [GRID_WIDTH // 4, GRID_HEIGHT // 2]  # Reset player position
-    ai_pos = [(GRID_WIDTH * 3) // 4, GRID_HEIGHT // 2]  # Reset AI position
-
-    # Initialize starting positions
-    board[player_pos[1]][player_pos[0]] = 'player'
-    board[ai_pos[1]][ai_pos[0]] = 'ai'
-    player_score = 1
-    ai_score = 1
 
     start_time = time.time()
     clock = pygame.time.Clock()  # Add clock for consistent frame rate
 
     while running:
-        screen.fill(PINK)
+        if profiler:
+            profiler.start_frame()
         current_time = time.time()
         elapsed_time = current_time - start_time
         remaining_time = max(0, game_duration - elapsed_time)
+        if tick_based:
+            # Seeded and headless games run on the tick count, not the wall clock
+            remaining_time = tick_time_left()
 
-        # Check freeze duration
-        if freeze_active and current_time - freeze_start_time >= FREEZE_DURATION:
-            freeze_active = False
-
-        for event in pygame.event.get():
+        for event in pygame.event.get() if not headless else ():
             if event.type == pygame.QUIT:
                 running = False
                 break
+            if event.type in EXPOSE_EVENTS:
+                renderer.invalidate()
 
-            if game_mode == 'human_vs_ai' and event.type == pygame.KEYDOWN and not freeze_active:
+            if game_mode == 'human_vs_ai' and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_w:  # Up
                     move_player(0, -1)
                 elif event.key == pygame.K_s:  # Down
@@ -524,44 +315,111 @@ def main():
                     move_player(-1, 0)
                 elif event.key == pygame.K_d:  # Right
                     move_player(1, 0)
-
-        # AI movement with timer
-        if current_time - ai_move_timer >= AI_MOVE_DELAY:
-            if game_mode == 'ai_vs_ai':
-                # In AI vs AI mode, both players are AI
-                if turn == 'player':
-                    move_player_ai()
-                    turn = 'ai'
-                else:
-                    move_ai()
-                    turn = 'player'
-            elif game_mode == 'human_vs_ai':
-                # In human vs AI mode, only AI moves
-                move_ai()
+        if not running:
+            # Closed: nothing else in this frame may touch the game
+            if profiler:
+                profiler.end_frame()
+            break
+        if profiler:
+            profiler.lap('events')
+
+        # Keep the AI thinking in the background and pick up its answer. In
+        # AI vs AI mode the two sides take turns; in human vs AI only the AI
+        # searches.
+        if not state.frozen() and ai_result is None and not ai_worker.busy():
+            start_ai_search()
+        result = ai_worker.poll(state_version)
+        if result is not None:
+            ai_result = result
+            if profiler:
+                profiler.record_search(result[0], result[2])
+
+        # AI movement with timer; each AI slot is one game tick. If the
+        # worker is not done yet the move waits for a later frame.
+        due = headless or current_time - ai_move_timer >= AI_MOVE_DELAY
+        if due and (state.frozen() or ai_result is not None):
+            move_ai()
+            state.advance_tick()
             ai_move_timer = current_time
+            if tick_based:
+                state.maybe_spawn_power_up(config.tick_power_up_chance)
+                # The tick just played may have been the last one
+                remaining_time = tick_time_left()
+            if headless:
+                first_frame('headless tick')
+        if profiler:
+            profiler.lap('ai')
+            if renderer:
+                renderer.overlay = profiler.overlay
+
+        # Draw only what changed since the last frame
+        dirty_rects = renderer.draw(state, remaining_time) if renderer else []
+
+        # Spawn power-ups (seeded and headless games spawn once per tick instead)
+        if not tick_based:
+            state.maybe_spawn_power_up()
+        if profiler:
+            profiler.lap('spawn')
+
+        if remaining_time <= 0 or state.game_over():
+            if profiler:
+                profiler.end_frame()
+            finished = True
+            break
 
-        draw_grid()
-        draw_scores()
-
-        # Draw remaining time
-        time_text = font.render(f"Time: {int(remaining_time)}s", True, WHITE)
-        screen.blit(time_text, (WIDTH - 180, 420))
-
-        # Spawn power-ups
-        if random.random() < 0.01 and len(power_ups) < 5:
-            row = random.randint(0, GRID_HEIGHT - 1)
-            col = random.randint(0, GRID_WIDTH - 1)
-            if board[row][col] == '' and (row, col) not in power_ups:
-                power_ups.append((row, col))
-                power_up_types[(row, col)] = random.choice(POWER_UPS)
-
-        if remaining_time <= 0 or game_over(board):
+        if headless:
+            # No window to flip; the frame ends here
+            if profiler:
+                profiler.end_frame()
+            if ai_result is None:
+                time.sleep(HEADLESS_POLL_INTERVAL)
+            continue
+        pygame.display.update(dirty_rects)
+        first_frame('game frame')
+        if profiler:
+            profiler.lap('flip')
+            profiler.end_frame()
+        clock.tick(FPS)  # Limit to 60 FPS
+
+    # The one place the game is wound down, however the loop ended
+    ai_worker.shutdown()
+    if state.recorder is not None:
+        state.recorder.close(state)
+    if finished:
+        if headless:
+            print_result()
+        else:
             display_scoreboard()
-            break
-        
-        pygame.display.flip()
-        clock.tick(60)  # Limit to 60 FPS
+    if profiler and profile_path:
+        profiler.export(profile_path)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Territory Vonquest")
+    GameConfig.add_arguments(parser)
+    parser.add_argument('--seed', type=int, default=None, help="seeded, tick-based game (reproducible AI vs AI)")
+    parser.add_argument('--ai-depth', type=int, default=SEEDED_AI_DEPTH, help="AI search depth with --seed")
+    parser.add_argument('--record', metavar='FILE', default=None, help="write a replay log of the game")
+    parser.add_argument('--book', default=BOOK_PATH, help="opening book file ('' to play without one)")
+    parser.add_argument('--weights', default=WEIGHTS_PATH, help="evaluation weights file from tune.py")
+    parser.add_argument('--search-workers', type=int, default=0,
+                        help="split the AI's root moves over this many processes")
+    parser.add_argument('--headless', action='store_true',
+                        help="AI vs AI without a window, fonts or sound; prints the result")
+    parser.add_argument('--profile', action='store_true', help="show frame timings and search counters")
+    parser.add_argument('--profile-out', metavar='FILE', default=None,
+                        help="write the profile to FILE (.json, otherwise CSV); implies --profile")
+    args = parser.parse_args()
+    if args.profile or args.profile_out:
+        profiler = FrameProfiler()
+        profile_path = args.profile_out
+    book_path = args.book
+    search_workers = args.search_workers
+    weights_path = args.weights
+    game_seed = args.seed
+    SEEDED_AI_DEPTH = args.ai_depth
+    record_path = args.record
+    headless = args.headless
+    configure(GameConfig.from_args(args))
     main()
-    pygame.quit()
+    if not headless:
+        pygame.quit()
@@ -0,0 +1,523 @@
+import argparse
+import math
+import random
+import re
+from array import array
+
+# Default grid size (matches the 15x15 board drawn by check.py)
+GRID_WIDTH = 15
+GRID_HEIGHT = 15
+# Smallest grid, walls included: two pieces with a tile between them
+MIN_WIDTH = 5
+MIN_HEIGHT = 4
+
+# Move directions, in the same order the original game tried them
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+# Tile owners; the sides are also the owner codes stored on the board.
+# Two-sided games are PLAYER vs AI; multi-agent games (multiagent.py) number
+# their agents 1..agents.
+EMPTY = 0
+PLAYER = 1
+AI = 2
+SIDE_NAMES = {PLAYER: 'player', AI: 'ai'}
+MAX_AGENTS = 16
+
+# Timing, counted in ticks (one tick = one AI move slot)
+AI_MOVE_DELAY = 0.5  # Seconds per tick in the pygame front end
+GAME_DURATION = 30  # Seconds
+FREEZE_DURATION = 3  # Seconds
+FREEZE_TICKS = int(FREEZE_DURATION / AI_MOVE_DELAY)
+GAME_TICKS = int(GAME_DURATION / AI_MOVE_DELAY)
+FPS = 60
+
+# Power-up types; a type's code in GameState.power_grid is its index + 1
+POWER_UPS = ['freeze', 'bonus']
+NO_POWER_UP = 0
+FREEZE_POWER_UP = 1
+BONUS_POWER_UP = 2
+BONUS_POINTS = 5
+MAX_POWER_UPS = 5
+POWER_UP_CHANCE = 0.01  # Chance per frame at 60 FPS
+
+# Zobrist hashing: one random 64-bit key per (feature, cell). Tables are
+# generated from a fixed seed so hashes are stable across processes and runs.
+ZOBRIST_SEED = 0x7E4417
+SIDE_KEY = 0x9E3779B97F4A7C15  # XORed in when the AI is to move
+_zobrist_tables = {}
+
+
+def zobrist_keys(width, height, agents=2):
+    if agents > 2:
+        # Multi-agent games (multiagent.py) never look a position up, so
+        # instead of two key tables per agent every key is in one shared
+        # all-zero table: the hash stays 0 and is not worth using as a key
+        zero = _zobrist_tables.get((width, height, 0))
+        if zero is None:
+            zero = _zobrist_tables[(width, height, 0)] = array('Q', bytes(8 * width * height))
+        return {'tile': [None] + [zero] * agents, 'piece': [None] + [zero] * agents,
+                'power_up': [None] + [zero] * len(POWER_UPS)}
+    keys = _zobrist_tables.get((width, height))
+    if keys is None:
+        rng = random.Random(ZOBRIST_SEED ^ (width << 20) ^ height)
+        cells = width * height
+
+        def table():
+            return array('Q', rng.randbytes(8 * cells))
+
+        keys = {
+            'tile': [None, table(), table()],  # Indexed by owner
+            'piece': [None, table(), table()],  # Indexed by side
+        }
+        keys['power_up'] = [None] + [table() for _ in POWER_UPS]  # Indexed by power-up code
+        _zobrist_tables[(width, height)] = keys
+    return keys
+
+
+_move_tables = {}
+
+
+def move_tables(width, height):
+    # Neighbour lookup tables, built once per grid size and shared by every
+    # state of that size:
+    #   'kinds'    flat bytearray, one byte per cell: bit i is set when the
+    #              cell's neighbour in DIRECTIONS[i] is playable (0 = wall)
+    #   'moves'    for each kind, the offsets of those neighbours, in
+    #              DIRECTIONS order (cell + offset = target cell)
+    #   'adjacent' offsets of all four neighbours of a cell
+    # One byte per cell keeps 1000x1000 grids cheap; rows are built from
+    # three templates instead of cell by cell.
+    tables = _move_tables.get((width, height))
+    if tables is None:
+        offsets = [dy * width + dx for dx, dy in DIRECTIONS]
+        down, up, right, left = (1 << i for i in range(4))
+        moves = [tuple(offset for i, offset in enumerate(offsets) if kind & (1 << i)) for kind in range(16)]
+
+        def row(vertical):
+            inner = bytes([vertical | right]) + bytes([vertical | right | left]) * (width - 4) + bytes([vertical | left])
+            return b'\0' + inner + b'\0'
+
+        wall = bytes(width)
+        kinds = bytearray(wall + row(down) + row(down | up) * (height - 4) + row(up) + wall)
+        tables = {'kinds': kinds, 'moves': moves, 'adjacent': tuple(offsets)}
+        _move_tables[(width, height)] = tables
+    return tables
+
+
+_POWER_UP_PATTERN = re.compile(b'[^\\x00]')
+
+
+def other_side(side):
+    return AI if side == PLAYER else PLAYER
+
+
+def start_positions(width, height, agents=2):
+    # Starting [x, y] of each side. Two sides start where the original game
+    # put them; more agents are spread over an even grid of the board.
+    if agents == 2:
+        return [[width // 4, height // 2], [(width * 3) // 4, height // 2]]
+    columns = math.ceil(math.sqrt(agents))
+    rows = math.ceil(agents / columns)
+    inner_width = width - 2
+    inner_height = height - 2
+    return [[1 + (2 * (agent % columns) + 1) * inner_width // (2 * columns),
+             1 + (2 * (agent // columns) + 1) * inner_height // (2 * rows)] for agent in range(agents)]
+
+
+def _at_least(minimum):
+    # argparse type for an integer option with a lower limit
+    def parse(text):
+        value = int(text)
+        if value < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}")
+        return value
+    return parse
+
+
+class GameConfig:
+    # Runtime game settings. Everything time-based is converted to ticks of
+    # move_delay seconds, which is how GameState and the search count time.
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, duration=GAME_DURATION,
+                 move_delay=AI_MOVE_DELAY, freeze_duration=FREEZE_DURATION, agents=2):
+        if width < MIN_WIDTH or height < MIN_HEIGHT:
+            raise ValueError(f"grid must be at least {MIN_WIDTH}x{MIN_HEIGHT} "
+                             "(walls plus two pieces and a tile between them)")
+        if not 2 <= agents <= MAX_AGENTS:
+            raise ValueError(f"agents must be between 2 and {MAX_AGENTS}")
+        columns = math.ceil(math.sqrt(agents))
+        if agents > 2 and (width - 2 < columns or height - 2 < math.ceil(agents / columns)):
+            raise ValueError(f"a {width}x{height} grid is too small for {agents} agents")
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.move_delay = move_delay
+        self.freeze_duration = freeze_duration
+        self.agents = agents
+
+    @property
+    def game_ticks(self):
+        return int(self.duration / self.move_delay)
+
+    @property
+    def freeze_ticks(self):
+        return int(self.freeze_duration / self.move_delay)
+
+    @property
+    def tick_power_up_chance(self):
+        # Per-frame spawn rate expressed per tick, for headless games that skip frames
+        return 1 - (1 - POWER_UP_CHANCE) ** (FPS * self.move_delay)
+
+    def new_game(self, seed=None):
+        return GameState(self.width, self.height, seed, self.freeze_ticks, self.agents)
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--width', type=_at_least(MIN_WIDTH), default=GRID_WIDTH,
+                            help="grid width, walls included")
+        parser.add_argument('--height', type=_at_least(MIN_HEIGHT), default=GRID_HEIGHT,
+                            help="grid height, walls included")
+        parser.add_argument('--duration', type=float, default=GAME_DURATION, help="game length in seconds")
+        parser.add_argument('--move-delay', type=float, default=AI_MOVE_DELAY, help="seconds per AI move (one tick)")
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.width, args.height, args.duration, args.move_delay)
+
+
+class GameState:
+    # Self-contained copy of everything the rules and the search need.
+    # Moves are applied with make_move and rolled back with unmake_move, so
+    # the search never has to copy the board. Real moves go through
+    # play_move, which also applies power-up effects. Nothing here imports
+    # pygame, so any number of games can live in one headless process.
+    #
+    # The board is a flat bytearray of owner codes (cell = y * width + x)
+    # with running tile counts, so copies are a single memcpy, game over is
+    # O(1), and board_ops can view it as a NumPy array without copying.
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None, freeze_length=FREEZE_TICKS, agents=2):
+        self.width = width
+        self.height = height
+        self.freeze_length = freeze_length  # Ticks a freeze power-up lasts
+        self.rng = random.Random(seed)
+        self.agents = agents
+        self.sides = tuple(range(1, agents + 1))
+        self.turn = PLAYER
+        self.tick = 0
+        self.freeze_ticks = 0  # Ticks left before the freeze wears off
+        self.cells = bytearray(width * height)
+        # Tiles per owner; counts[EMPTY] only counts playable tiles
+        self.counts = [(width - 2) * (height - 2)] + [0] * agents
+        # Piece positions as [x, y], indexed by side, and the same as cell indices
+        self.positions = [None] + start_positions(width, height, agents)
+        self.piece_cells = [None] + [y * width + x for x, y in self.positions[1:]]
+        self.scores = [0] * (agents + 1)
+        for side in self.sides:
+            x, y = self.positions[side]
+            self.cells[y * width + x] = side
+            self.counts[EMPTY] -= 1
+            self.counts[side] += 1
+            self.scores[side] = 1
+        # Power-ups as one code per cell (NO_POWER_UP or a type's code), so
+        # lookup, placement and pickup are O(1)
+        self.power_grid = bytearray(width * height)
+        self.power_up_count = 0
+        # Playable cells that are unowned and hold no power-up, for spawning.
+        # free_slot[cell] is the cell's position in free_cells; removal swaps
+        # the last entry into its place and unmake_move reverses that exactly.
+        self.free_cells = array('i', [y * width + x for y in range(1, height - 1) for x in range(1, width - 1)
+                                      if not self.cells[y * width + x]])
+        self.free_slot = array('i', bytes(4 * width * height))
+        for slot, index in enumerate(self.free_cells):
+            self.free_slot[index] = slot
+        # Each entry: (side, old cell, previous owner, own delta, opponent delta, power-up, hash);
+        # the opponent delta is applied to the previous owner's score
+        self.undo_stack = []
+        self.zobrist = zobrist_keys(width, height, agents)
+        self.tables = move_tables(width, height)
+        self.hash = self.compute_hash()
+        # When track_changes is on, real moves and spawns record the cells
+        # they touch so a renderer can redraw just those (see drain_changes)
+        self.track_changes = False
+        self.changes = []
+        # Optional replay.EventLog; real moves, power-up pickups and spawns
+        # are written to it as they happen
+        self.recorder = None
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.width = self.width
+        state.height = self.height
+        state.freeze_length = self.freeze_length
+        state.rng = random.Random()
+        state.rng.setstate(self.rng.getstate())
+        state.agents = self.agents
+        state.sides = self.sides
+        state.turn = self.turn
+        state.tick = self.tick
+        state.freeze_ticks = self.freeze_ticks
+        state.cells = bytearray(self.cells)
+        state.counts = list(self.counts)
+        state.positions = [None] + [list(pos) for pos in self.positions[1:]]
+        state.piece_cells = list(self.piece_cells)
+        state.scores = list(self.scores)
+        state.power_grid = bytearray(self.power_grid)
+        state.power_up_count = self.power_up_count
+        state.free_cells = array('i', self.free_cells)
+        state.free_slot = array('i', self.free_slot)
+        state.undo_stack = []
+        state.zobrist = self.zobrist
+        state.tables = self.tables
+        state.hash = self.hash
+        state.track_changes = False
+        state.changes = []
+        state.recorder = None
+        return state
+
+    # Pickle without the shared Zobrist and move tables; they are rebuilt (or
+    # found in the per-process cache) on load. What is sent is about 10 bytes
+    # per cell: the board and power-up grid (one byte each) plus free_cells
+    # and free_slot (four each).
+    def __getstate__(self):
+        data = self.__dict__.copy()
+        del data['zobrist']
+        del data['tables']
+        data['recorder'] = None
+        return data
+
+    def __setstate__(self, data):
+        self.__dict__.update(data)
+        self.zobrist = zobrist_keys(self.width, self.height, self.agents)
+        self.tables = move_tables(self.width, self.height)
+
+    # Convenience views used by the renderer and reports
+    @property
+    def player_pos(self):
+        return self.positions[PLAYER]
+
+    @property
+    def ai_pos(self):
+        return self.positions[AI]
+
+    @property
+    def player_score(self):
+        return self.scores[PLAYER]
+
+    @property
+    def ai_score(self):
+        return self.scores[AI]
+
+    def owner(self, x, y):
+        return self.cells[y * self.width + x]
+
+    def compute_hash(self):
+        # Full hash of board, piece positions and power-ups; make_move keeps it
+        # up to date incrementally. Side to move is added by the search.
+        keys = self.zobrist
+        h = 0
+        for index, owner in enumerate(self.cells):
+            if owner:
+                h ^= keys['tile'][owner][index]
+        for side in self.sides:
+            x, y = self.positions[side]
+            h ^= keys['piece'][side][y * self.width + x]
+        for index in self.power_up_cells():
+            h ^= keys['power_up'][self.power_grid[index]][index]
+        return h
+
+    def power_up_at(self, index):
+        # Type of the power-up on cell index, or None
+        code = self.power_grid[index]
+        return POWER_UPS[code - 1] if code else None
+
+    def power_up_cells(self):
+        # Cells holding a power-up, in board order
+        return [match.start() for match in _POWER_UP_PATTERN.finditer(self.power_grid)]
+
+    def position_key(self, side):
+        return self.hash ^ SIDE_KEY if side == AI else self.hash
+
+    def get_pos(self, side):
+        return self.positions[side]
+
+    def get_score(self, side):
+        return self.scores[side]
+
+    def get_valid_moves(self, side):
+        # Legal moves as (x, y) squares: any playable neighbour without a piece on it
+        origin = self.piece_cells[side]
+        pieces = self.piece_cells
+        width = self.width
+        return [((origin + offset) % width, (origin + offset) // width)
+                for offset in self.move_offsets(side) if origin + offset not in pieces]
+
+    def move_offsets(self, side):
+        # Index-based move generation for the search: the shared tuple of
+        # offsets from the side's piece (piece_cells[side]) to the playable
+        # cells next to it. The cell of the other piece is not removed; skip
+        # it with blocked_cell(side). Nothing is allocated.
+        return self.tables['moves'][self.tables['kinds'][self.piece_cells[side]]]
+
+    def blocked_cell(self, side):
+        # Two-sided games only; with more agents use get_valid_moves
+        return self.piece_cells[other_side(side)]
+
+    def make_move(self, move, side):
+        return self.make_move_index(move[1] * self.width + move[0], side)
+
+    def make_move_index(self, index, side):
+        # Move side's piece to cell index; returns the power-up picked up, if any
+        old_index = self.piece_cells[side]
+        previous = self.cells[index]
+        own_delta = 0
+        opponent_delta = 0
+        keys = self.zobrist
+        old_hash = self.hash
+        piece_keys = keys['piece'][side]
+        h = old_hash ^ piece_keys[old_index] ^ piece_keys[index]
+
+        # Pick up a power-up (they only ever sit on empty tiles)
+        power_up = self.power_grid[index]
+        if power_up:
+            self.power_grid[index] = NO_POWER_UP
+            self.power_up_count -= 1
+            h ^= keys['power_up'][power_up][index]
+            if power_up == BONUS_POWER_UP:
+                own_delta += BONUS_POINTS
+        elif previous == EMPTY:
+            self.remove_free_cell(index)
+
+        # Capture the tile
+        if previous != side:
+            if previous != EMPTY:
+                opponent_delta = -1
+                h ^= keys['tile'][previous][index]
+            own_delta += 1
+            h ^= keys['tile'][side][index]
+            self.cells[index] = side
+            self.counts[previous] -= 1
+            self.counts[side] += 1
+
+        self.undo_stack.append((side, old_index, previous, own_delta, opponent_delta, power_up, old_hash))
+        self.hash = h
+        self.piece_cells[side] = index
+        pos = self.positions[side]
+        pos[1], pos[0] = divmod(index, self.width)
+        self.scores[side] += own_delta
+        self.scores[previous] += opponent_delta
+        return POWER_UPS[power_up - 1] if power_up else None
+
+    def unmake_move(self):
+        side, old_index, previous, own_delta, opponent_delta, power_up, old_hash = self.undo_stack.pop()
+        index = self.piece_cells[side]
+        owner = self.cells[index]
+        if owner != previous:
+            self.cells[index] = previous
+            self.counts[owner] -= 1
+            self.counts[previous] += 1
+        if power_up:
+            self.power_grid[index] = power_up
+            self.power_up_count += 1
+        elif previous == EMPTY:
+            self.restore_free_cell(index)
+        self.piece_cells[side] = old_index
+        pos = self.positions[side]
+        pos[1], pos[0] = divmod(old_index, self.width)
+        self.hash = old_hash
+        self.scores[side] -= own_delta
+        self.scores[previous] -= opponent_delta
+
+    def play_move(self, move, side):
+        # Apply a real (non-search) move, including power-up effects
+        if self.track_changes:
+            x, y = self.positions[side]
+            self.changes.append(y * self.width + x)
+            self.changes.append(move[1] * self.width + move[0])
+        power_type = self.make_move(move, side)
+        self.undo_stack.pop()
+        if power_type == 'freeze':
+            self.freeze_ticks = self.freeze_length
+        if self.recorder is not None:
+            self.recorder.move(self.tick, side, move)
+            if power_type:
+                self.recorder.power_up(self.tick, side, power_type)
+        return power_type
+
+    def move_player(self, dx, dy, side=PLAYER):
+        # Human input: step one tile if the destination is free
+        pos = self.positions[side]
+        move = (pos[0] + dx, pos[1] + dy)
+        if self.frozen() or move not in self.get_valid_moves(side):
+            return False
+        self.play_move(move, side)
+        return True
+
+    def frozen(self):
+        return self.freeze_ticks > 0
+
+    def advance_tick(self):
+        self.tick += 1
+        if self.freeze_ticks > 0:
+            self.freeze_ticks -= 1
+
+    def remove_free_cell(self, index):
+        slot = self.free_slot[index]
+        last = self.free_cells.pop()
+        if last != index:
+            self.free_cells[slot] = last
+            self.free_slot[last] = slot
+
+    def restore_free_cell(self, index):
+        # Undo remove_free_cell(index); free_slot[index] still holds its old slot
+        slot = self.free_slot[index]
+        if slot == len(self.free_cells):
+            self.free_cells.append(index)
+        else:
+            last = self.free_cells[slot]
+            self.free_cells[slot] = index
+            self.free_slot[last] = len(self.free_cells)
+            self.free_cells.append(last)
+
+    def spawn_power_up(self):
+        # Drop a random power-up on a random free tile (unowned, no power-up)
+        if self.power_up_count >= MAX_POWER_UPS or not self.free_cells:
+            return None
+        index = self.free_cells[self.rng.randrange(len(self.free_cells))]
+        row, col = divmod(index, self.width)
+        self.place_power_up(row, col, self.rng.choice(POWER_UPS))
+        return (row, col)
+
+    def place_power_up(self, row, col, power_type):
+        index = row * self.width + col
+        if not self.tables['kinds'][index] or self.cells[index] != EMPTY or self.power_grid[index]:
+            raise ValueError(f"cannot place a power-up on taken tile {(row, col)}")
+        code = POWER_UPS.index(power_type) + 1
+        self.power_grid[index] = code
+        self.power_up_count += 1
+        self.remove_free_cell(index)
+        self.hash ^= self.zobrist['power_up'][code][index]
+        if self.track_changes:
+            self.changes.append(index)
+        if self.recorder is not None:
+            self.recorder.spawn(self.tick, row, col, power_type)
+
+    def drain_changes(self):
+        changes = self.changes
+        self.changes = []
+        return changes
+
+    def maybe_spawn_power_up(self, chance=POWER_UP_CHANCE):
+        if self.rng.random() < chance:
+            return self.spawn_power_up()
+        return None
+
+    def game_over(self):
+        # Every playable tile has been captured
+        return self.counts[EMPTY] == 0
+
+    def winner(self):
+        # The side with the highest score, or None on a tie for first
+        best = max(self.scores[1:])
+        leaders = [side for side in self.sides if self.scores[side] == best]
+        return leaders[0] if len(leaders) == 1 else None
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from profiling import percentile
+
+# Load test for server.py. Runs waves of simulated players, more each wave;
+# every player holds its own connection and game and sends a random legal
+# move every --interval-ms (a human's pace), starting a new game when one
+# ends. The round trip of each move, AI reply included, is timed. The
+# largest wave whose p99 stays within --target-p99-ms is the number of
+# sessions the server supports at that pace.
+#   python loadtest.py --sessions 5,10,20,40,80 --budget-ms 50
+#   python loadtest.py --connect 127.0.0.1:8765      - test a running server
+# Without --connect a server is started for the run (--workers, --budget-ms).
+
+DEFAULT_SESSIONS = '5,10,20,40,80'
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        reply = json.loads(await self.reader.readline())
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def close(self):
+        self.writer.close()
+
+
+async def play_session(host, port, moves, interval, budget_ms, rng, latencies, stop_at):
+    # One simulated player: moves moves at one per interval seconds, or
+    # fewer if the wave's time runs out
+    reader, writer = await asyncio.open_connection(host, port)
+    connection = Connection(reader, writer)
+    games = 0
+    try:
+        # Spread the players over the first interval, as real ones would be
+        await asyncio.sleep(rng.random() * interval)
+        game = await connection.request(op='new', seed=rng.randrange(1 << 30), budget_ms=budget_ms)
+        games += 1
+        for _ in range(moves):
+            if time.perf_counter() > stop_at:
+                break
+            sent = time.perf_counter()
+            game = await connection.request(op='move', game=game['game'],
+                                            dir=rng.choice(game['moves']) if game['moves'] else 'stay')
+            latencies.append((time.perf_counter() - sent) * 1000)
+            if game['over']:
+                await connection.request(op='close', game=game['game'])
+                game = await connection.request(op='new', seed=rng.randrange(1 << 30), budget_ms=budget_ms)
+                games += 1
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - sent)))
+    finally:
+        connection.close()
+    return games
+
+
+async def run_wave(host, port, sessions, moves, interval, budget_ms, seed):
+    latencies = []
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    # A wave that falls far behind its pace is cut off rather than left to
+    # run for minutes
+    stop_at = started + 3 * (moves + 1) * interval + 10
+    games = await asyncio.gather(*(
+        play_session(host, port, moves, interval, budget_ms, random.Random(rng.random()), latencies, stop_at)
+        for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+    return {
+        'sessions': sessions,
+        'games': sum(games),
+        'moves': len(latencies),
+        'moves_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': max(latencies, default=0.0),
+    }
+
+
+def start_server(workers, budget_ms):
+    # server.py on a free port; returns the process and its (host, port)
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+    command = [sys.executable, server, '--port', '0', '--budget-ms', str(budget_ms)]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('listening on '):
+        process.kill()
+        raise SystemExit("server did not start")
+    host, port = line.split()[-1].rsplit(':', 1)
+    return process, (host, int(port))
+
+
+async def load_test(host, port, waves, moves, interval, budget_ms, target_p99_ms, seed):
+    supported = 0
+    for number, sessions in enumerate(waves):
+        result = await run_wave(host, port, sessions, moves, interval, budget_ms, seed + number)
+        print(f"{sessions:6} sessions: {result['moves_per_sec']:7.1f} moves/s, "
+              f"p50 {result['p50_ms']:7.1f} ms, p99 {result['p99_ms']:7.1f} ms, max {result['max_ms']:7.1f} ms "
+              f"({result['moves']} moves, {result['games']} games)")
+        if result['p99_ms'] > target_p99_ms:
+            break
+        supported = sessions
+    return supported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local match server")
+    parser.add_argument('--connect', metavar='HOST:PORT', default=None,
+                        help="test a running server instead of starting one")
+    parser.add_argument('--workers', type=int, default=None, help="AI processes of the started server")
+    parser.add_argument('--sessions', default=DEFAULT_SESSIONS, help="comma-separated session counts, one wave each")
+    parser.add_argument('--moves', type=int, default=20, help="moves per session per wave")
+    parser.add_argument('--interval-ms', type=float, default=500, help="time between a player's moves")
+    parser.add_argument('--budget-ms', type=float, default=50, help="AI time budget per move")
+    parser.add_argument('--target-p99-ms', type=float, default=200,
+                        help="p99 move latency a wave must stay within to count as supported")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    waves = [int(count) for count in args.sessions.split(',')]
+
+    process = None
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        port = int(port)
+    else:
+        process, (host, port) = start_server(args.workers, args.budget_ms)
+    try:
+        supported = asyncio.run(load_test(host, port, waves, args.moves, args.interval_ms / 1000, args.budget_ms,
+                                          args.target_p99_ms, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(f"sessions supported at p99 <= {args.target_p99_ms:g} ms: {supported}"
+          + ("" if supported else " (the first wave already missed the target)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import math
+import time
+
+import numpy as np
+
+from game_state import (AI, BONUS_POINTS, BONUS_POWER_UP, EMPTY, FREEZE_POWER_UP, MAX_POWER_UPS, NO_POWER_UP,
+                        POWER_UPS, other_side)
+
+# Monte Carlo tree search (UCT), an alternative to the minimax agent in
+# search.py for a game whose power-ups spawn at random. The tree is built
+# with make_move/unmake_move on the real state; each new leaf is scored by a
+# batch of random playouts to the end of the game, run side by side as NumPy
+# arrays (one row per playout). Needs NumPy, like board_ops.
+
+# Exploration constant of the UCT formula
+UCT_C = math.sqrt(2)
+# Playouts run together from every new leaf
+PLAYOUT_BATCH = 64
+# Playout move weights by what the target square holds; uniformly random
+# playouts wander over their own tiles and lose to any greedy player
+OWN_TILE_WEIGHT = 1.0
+EMPTY_TILE_WEIGHT = 4.0
+ENEMY_TILE_WEIGHT = 6.0
+BONUS_WEIGHT = 4.0  # Added on top of the tile weight
+# Playouts stop after this many ticks; further out they are mostly noise
+PLAYOUT_TICKS = 20
+# A playout is worth 0.5 + 0.5 * tanh(score margin / MARGIN_SCALE) to the
+# side it favours: smoother than win/loss, so one good move shows up
+MARGIN_SCALE = 8.0
+
+
+class PlayoutStats:
+    def __init__(self):
+        self.iterations = 0  # Tree nodes expanded
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Node:
+    # mover is the side that played move to reach this node; wins are the
+    # playout rewards from the mover's point of view
+
+    def __init__(self, move, mover, parent, moves):
+        self.move = move
+        self.mover = mover
+        self.parent = parent
+        self.untried = moves
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + UCT_C * math.sqrt(log_visits / child.visits))
+
+
+def playouts(state, side, ticks, batch, rng, spawn_chance, freeze_length):
+    # Play batch random games from state for the given number of ticks, side
+    # to move first, and return the summed rewards (side's, other side's)
+    width = state.width
+    cells = np.tile(np.frombuffer(state.cells, dtype=np.int8), (batch, 1))
+    power_ups = np.tile(np.frombuffer(state.power_grid, dtype=np.int8), (batch, 1))
+    power_up_counts = np.full(batch, state.power_up_count)
+    positions = np.zeros((batch, AI + 1), dtype=np.intp)
+    scores = np.zeros((batch, AI + 1), dtype=np.int32)
+    for piece in (side, other_side(side)):
+        x, y = state.positions[piece]
+        positions[:, piece] = y * width + x
+        scores[:, piece] = state.scores[piece]
+    empty = np.full(batch, state.counts[EMPTY])
+    freeze = np.full(batch, state.freeze_ticks)
+    playable = np.zeros(width * state.height, dtype=bool)
+    playable.reshape(state.height, width)[1:-1, 1:-1] = True
+    offsets = np.array([width, -width, 1, -1])
+    rows = np.arange(batch)
+
+    mover = side
+    for _ in range(ticks):
+        enemy = other_side(mover)
+        targets = positions[:, mover, None] + offsets
+        valid = playable[targets] & (targets != positions[:, enemy, None])
+        # Pick a valid direction per playout with probability proportional to
+        # its weight (the largest u ** (1 / weight) wins)
+        owners = np.take_along_axis(cells, targets, axis=1)
+        weights = np.where(owners == EMPTY, EMPTY_TILE_WEIGHT,
+                           np.where(owners == enemy, ENEMY_TILE_WEIGHT, OWN_TILE_WEIGHT))
+        weights += (np.take_along_axis(power_ups, targets, axis=1) == BONUS_POWER_UP) * BONUS_WEIGHT
+        choice = np.argmax(rng.random(valid.shape) ** (1 / weights) * valid, axis=1)
+        moving = valid.any(axis=1) & (freeze == 0) & (empty > 0)
+        moved = rows[moving]
+        target = targets[moved, choice[moving]]
+        previous = cells[moved, target]
+        captured = previous != mover
+        scores[moved, mover] += captured
+        scores[moved, enemy] -= previous == enemy
+        empty[moved] -= previous == EMPTY
+        cells[moved, target] = mover
+        positions[moved, mover] = target
+        picked = power_ups[moved, target]
+        scores[moved, mover] += (picked == BONUS_POWER_UP) * BONUS_POINTS
+        freeze[moved[picked == FREEZE_POWER_UP]] = freeze_length
+        power_up_counts[moved] -= picked != NO_POWER_UP
+        power_ups[moved, target] = NO_POWER_UP
+
+        # Tick over: freezes wear off and power-ups may spawn on empty tiles
+        freeze -= freeze > 0
+        spawn = rows[(rng.random(batch) < spawn_chance) & (power_up_counts < MAX_POWER_UPS)]
+        spot = rng.integers(1, state.height - 1, spawn.size) * width + rng.integers(1, width - 1, spawn.size)
+        free = (cells[spawn, spot] == EMPTY) & (power_ups[spawn, spot] == NO_POWER_UP)
+        spawn, spot = spawn[free], spot[free]
+        power_ups[spawn, spot] = rng.integers(1, len(POWER_UPS) + 1, spawn.size)
+        power_up_counts[spawn] += 1
+        mover = enemy
+
+    margin = scores[:, side] - scores[:, other_side(side)]
+    wins = float(np.sum(0.5 + 0.5 * np.tanh(margin / MARGIN_SCALE)))
+    return wins, batch - wins
+
+
+def mcts_best_move(state, side=AI, budget_ms=100, stats=None, ticks_left=None, rng=None,
+                   batch=PLAYOUT_BATCH, spawn_chance=0.0):
+    # Grow a UCT tree for budget_ms and return the most visited root move.
+    # ticks_left bounds the playouts (the game ends when the clock runs out);
+    # spawn_chance is the per-tick power-up chance used in playouts.
+    if stats is None:
+        stats = PlayoutStats()
+    if rng is None:
+        rng = np.random.default_rng()
+    if ticks_left is None:
+        ticks_left = 2 * state.counts[EMPTY]
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000
+    undo_depth = len(state.undo_stack)
+
+    moves = state.get_valid_moves(side)
+    if len(moves) <= 1:
+        return moves[0] if moves else None
+
+    root = Node(None, other_side(side), None, moves)
+    while True:
+        node = root
+        to_move = side
+        # Selection
+        while not node.untried and node.children:
+            node = node.select_child()
+            state.make_move(node.move, node.mover)
+            to_move = other_side(to_move)
+        # Expansion
+        depth = len(state.undo_stack) - undo_depth
+        if node.untried and not state.game_over() and depth < ticks_left:
+            move = node.untried.pop(rng.integers(len(node.untried)))
+            state.make_move(move, to_move)
+            child = Node(move, to_move, node, state.get_valid_moves(other_side(to_move)))
+            node.children.append(child)
+            node = child
+            to_move = other_side(to_move)
+            depth += 1
+            stats.iterations += 1
+        # Simulation
+        remaining = min(PLAYOUT_TICKS, ticks_left - depth) if not state.game_over() else 0
+        to_move_wins, other_wins = playouts(state, to_move, remaining, batch, rng, spawn_chance,
+                                            state.freeze_length)
+        stats.playouts += batch
+        # Backpropagation
+        while node is not None:
+            node.visits += batch
+            node.wins += to_move_wins if node.mover == to_move else other_wins
+            node = node.parent
+        while len(state.undo_stack) > undo_depth:
+            state.unmake_move()
+        if time.perf_counter() >= deadline:
+            break
+
+    stats.elapsed += time.perf_counter() - start
+    return max(root.children, key=lambda child: child.visits).move
@@ -0,0 +1,229 @@
+import argparse
+import multiprocessing
+import time
+
+from game_state import FREEZE_POWER_UP, GameConfig
+from workers import worker_context
+
+# Multi-agent games: 2-16 agents on one board, all moving once per tick.
+# Every agent decides on the same snapshot of the tick, so the decisions are
+# independent and are computed in a batch, split over worker processes.
+# Each worker keeps its own copy of the game and is sent only the events of
+# the previous tick (moves, spawns), so the per-tick traffic does not grow
+# with the board. Decisions are deterministic, so a game plays out the same
+# with any number of workers.
+#   python multiagent.py --agents 8 --width 60 --height 60 --workers 4
+#   python multiagent.py --agents 8 --compare    - also time the serial run
+
+PLAN_DEPTH = 4  # Own moves an agent looks ahead
+PLAN_DISCOUNT = 0.9  # Weight of each later move, so sooner gains win ties
+FREEZE_PENALTY = 2  # A freeze stops every agent, including the one that took it
+
+# Event kinds sent to the workers
+MOVE = 0
+SPAWN = 1
+TICK = 2
+
+
+def plan_move(state, side, depth=PLAN_DEPTH):
+    # Best (x, y) for side over its next depth moves, with the other agents
+    # standing still; None when the piece is boxed in
+    origin = state.piece_cells[side]
+    pieces = state.piece_cells
+    best = None
+    best_value = None
+    for offset in state.move_offsets(side):
+        target = origin + offset
+        if target in pieces:
+            continue
+        value = plan_value(state, side, target, depth)
+        if best_value is None or value > best_value:
+            best = target
+            best_value = value
+    return None if best is None else (best % state.width, best // state.width)
+
+
+def plan_value(state, side, index, depth):
+    state.make_move_index(index, side)
+    _, _, _, own_delta, opponent_delta, power_up, _ = state.undo_stack[-1]
+    # Taking an enemy tile also costs its owner a point
+    value = own_delta - opponent_delta - (FREEZE_PENALTY if power_up == FREEZE_POWER_UP else 0)
+    if depth > 1:
+        origin = state.piece_cells[side]
+        pieces = state.piece_cells
+        best = None
+        for offset in state.move_offsets(side):
+            target = origin + offset
+            # The cell just left is free again; other pieces still block
+            if target not in pieces:
+                child = plan_value(state, side, target, depth - 1)
+                if best is None or child > best:
+                    best = child
+        if best is not None:
+            value += PLAN_DISCOUNT * best
+    state.unmake_move()
+    return value
+
+
+class TickEvents:
+    # GameState.recorder that collects what happened since the last batch,
+    # for the workers to replay on their copies
+
+    def __init__(self):
+        self.events = []
+
+    def move(self, tick, side, move):
+        self.events.append((MOVE, side, move))
+
+    def spawn(self, tick, row, col, power_type):
+        self.events.append((SPAWN, (row, col), power_type))
+
+    def power_up(self, tick, side, power_type):
+        pass  # Replaying the move picks it up again
+
+    def tick(self):
+        self.events.append((TICK, None, None))
+
+    def drain(self):
+        events = self.events
+        self.events = []
+        return events
+
+
+def apply_events(state, events):
+    for kind, a, b in events:
+        if kind == MOVE:
+            state.play_move(b, a)
+        elif kind == SPAWN:
+            state.place_power_up(a[0], a[1], b)
+        else:
+            state.advance_tick()
+
+
+def _agent_worker(connection, state, sides, depth):
+    while True:
+        events = connection.recv()
+        if events is None:
+            break
+        apply_events(state, events)
+        connection.send([plan_move(state, side, depth) for side in sides])
+    connection.close()
+
+
+class AgentPool:
+    # Decides every agent's move for a tick. With workers=0 the decisions are
+    # made in this process on the game itself; otherwise the agents are split
+    # into one fixed group per worker process.
+
+    def __init__(self, state, depth=PLAN_DEPTH, workers=None):
+        self.state = state
+        self.depth = depth
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, state.agents)
+        self.groups = [state.sides[worker::workers] for worker in range(workers)] if workers else []
+        self.connections = []
+        self.processes = []
+        context = worker_context()
+        for sides in self.groups:
+            ours, theirs = context.Pipe()
+            process = context.Process(target=_agent_worker, args=(theirs, state.copy(), sides, depth), daemon=True)
+            process.start()
+            theirs.close()
+            self.connections.append(ours)
+            self.processes.append(process)
+        self.decisions = 0
+        self.decide_time = 0.0
+
+    def decide(self, events):
+        # {side: move or None} for every agent; events are what happened to
+        # the game since the previous call
+        start = time.perf_counter()
+        if not self.groups:
+            moves = {side: plan_move(self.state, side, self.depth) for side in self.state.sides}
+        else:
+            for connection in self.connections:
+                connection.send(events)
+            moves = {}
+            for sides, connection in zip(self.groups, self.connections):
+                moves.update(zip(sides, connection.recv()))
+        self.decisions += len(moves)
+        self.decide_time += time.perf_counter() - start
+        return moves
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+
+def apply_moves(state, moves):
+    # Play the tick's moves one agent at a time, starting with a different
+    # agent every tick. A move onto a piece that got there first this tick
+    # is dropped and that agent stays put.
+    sides = state.sides
+    first = state.tick % len(sides)
+    for side in sides[first:] + sides[:first]:
+        move = moves[side]
+        if move is not None and move[1] * state.width + move[0] not in state.piece_cells:
+            state.play_move(move, side)
+
+
+def play_game(config, seed=None, depth=PLAN_DEPTH, workers=None):
+    state = config.new_game(seed)
+    events = TickEvents()
+    state.recorder = events
+    pool = AgentPool(state, depth, workers)
+    spawn_chance = config.tick_power_up_chance
+    start = time.perf_counter()
+    try:
+        while state.tick < config.game_ticks and not state.game_over():
+            if not state.frozen():
+                apply_moves(state, pool.decide(events.drain()))
+            state.advance_tick()
+            events.tick()
+            state.maybe_spawn_power_up(spawn_chance)
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'scores': state.scores[1:],
+        'winner': state.winner(),
+        'ticks': state.tick,
+        'elapsed': elapsed,
+        'decisions_per_sec': pool.decisions / pool.decide_time if pool.decide_time > 0 else 0.0,
+        'ticks_per_sec': state.tick / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-agent games")
+    parser.add_argument('--agents', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=PLAN_DEPTH, help="own moves each agent looks ahead")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores, 0: serial)")
+    parser.add_argument('--compare', action='store_true', help="also play the game serially and compare")
+    GameConfig.add_arguments(parser)
+    args = parser.parse_args()
+    config = GameConfig(args.width, args.height, args.duration, args.move_delay, agents=args.agents)
+
+    runs = [('pool', args.workers)]
+    if args.compare:
+        runs.append(('serial', 0))
+    results = []
+    for name, workers in runs:
+        result = play_game(config, args.seed, args.depth, workers)
+        results.append(result)
+        print(f"{name:7} {result['ticks']} ticks in {result['elapsed']:.2f}s: {result['ticks_per_sec']:.1f} ticks/s, "
+              f"{result['decisions_per_sec']:,.0f} decisions/s")
+    print(f"scores: {results[0]['scores']} (winner: {results[0]['winner'] or 'tie'})")
+    if args.compare:
+        if results[0]['scores'] != results[1]['scores']:
+            raise SystemExit("pool and serial games differ")
+        print(f"speedup: {results[1]['elapsed'] / results[0]['elapsed']:.2f}x, same game")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_state import AI, other_side
+from search import (EXACT, MoveOrdering, SearchStats, TranspositionTable, iterative_deepening, minimax,
+                    order_moves)
+from workers import worker_context
+
+# Root-splitting search over a process pool. The first root move (the
+# likely best one, after ordering) is searched on its own with a full
+# window; the rest are then searched side by side against its value. A move
+# that beats that value comes back with its exact value and the others only
+# prove they are no better, so the move picked is the first, in the serial
+# root order, with the best value: the same move get_best_move returns at
+# the same depth. Each worker keeps its own transposition table and move
+# ordering between searches.
+
+_tt = None
+_ordering = None
+_stop = None  # Event that cancels the running search in every worker
+
+
+def _init_worker(stop_event):
+    global _tt, _ordering, _stop
+    _tt = TranspositionTable()
+    _ordering = MoveOrdering()
+    _stop = stop_event
+
+
+def _search_root_move(state_data, side, move, depth, alpha, beta, deadline, use_tt):
+    state = pickle.loads(state_data)
+    stats = SearchStats()
+    stats.deadline = deadline
+    stats.stop = _stop
+    if use_tt:
+        _tt.new_search()
+        _ordering.new_search()
+    state.make_move_index(move, side)
+    score = minimax(state, depth - 1, alpha, beta, other_side(side), stats,
+                    _tt if use_tt else None, _ordering if use_tt else None)
+    stats.stop = None
+    return score, stats
+
+
+class ParallelSearch:
+    # get_best_move and iterative_deepening with the root moves split over
+    # workers processes. use_tt=False searches the subtrees without
+    # transposition tables or killer/history ordering, like get_best_move
+    # with tt=None. Call shutdown() when done.
+
+    def __init__(self, workers=None, use_tt=True, stop_event=None):
+        context = worker_context()
+        self.workers = workers or multiprocessing.cpu_count()
+        self.use_tt = use_tt
+        self.stop_event = stop_event if stop_event is not None else context.Event()
+        self.executor = ProcessPoolExecutor(self.workers, context, _init_worker, (self.stop_event,))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_best_move(self, state, side=AI, depth=2, stats=None, tt=None, first=None, ordering=None):
+        # Same arguments and result as search.get_best_move; tt and ordering
+        # only order the root moves, as they do there
+        if stats is None:
+            stats = SearchStats()
+        start = time.perf_counter()
+        origin = state.piece_cells[side]
+        blocked = state.blocked_cell(side)
+        valid_moves = [origin + offset for offset in state.move_offsets(side) if origin + offset != blocked]
+        tt_move = None
+        if tt is not None:
+            tt.new_search()
+            entry = tt.probe(state.position_key(side))
+            if entry is not None:
+                tt_move = entry[4]
+        if ordering is not None:
+            ordering.new_search()
+            ordering.sort(state, valid_moves, side, len(state.undo_stack), tt_move)
+        else:
+            order_moves(valid_moves, tt_move)
+        if first is not None:
+            order_moves(valid_moves, first[1] * state.width + first[0])
+        if not valid_moves:
+            stats.elapsed += time.perf_counter() - start
+            return None
+
+        is_ai = side == AI
+        state_data = pickle.dumps(state)
+        deadline = stats.deadline
+        inf = float('inf')
+
+        def submit(move, alpha, beta):
+            return self.executor.submit(_search_root_move, state_data, side, move, depth, alpha, beta, deadline,
+                                        self.use_tt)
+
+        best_move = valid_moves[0]
+        best_score, child_stats = submit(best_move, -inf, inf).result()
+        stats.merge(child_stats)
+        # Later moves only have to show whether they beat the first one
+        alpha, beta = (best_score, inf) if is_ai else (-inf, best_score)
+        futures = [(move, submit(move, alpha, beta)) for move in valid_moves[1:]]
+        try:
+            for move, future in futures:
+                score, child_stats = future.result()
+                stats.merge(child_stats)
+                if (score > best_score) if is_ai else (score < best_score):
+                    best_score = score
+                    best_move = move
+        finally:
+            for _, future in futures:
+                future.cancel()
+
+        if tt is not None:
+            tt.store(state.position_key(side), depth, EXACT, best_score, best_move)
+        stats.elapsed += time.perf_counter() - start
+        return best_move % state.width, best_move // state.width
+
+    def iterative_deepening(self, state, side=AI, budget_ms=100, stats=None, tt=None, max_depth=64,
+                            ordering=None):
+        return iterative_deepening(state, side, budget_ms, stats, tt, max_depth, ordering,
+                                   search=self.get_best_move)
@@ -0,0 +1,113 @@
+import csv
+import json
+import time
+
+# Opt-in frame and search instrumentation for the pygame front end
+# (python check.py --profile). The frame loop calls start_frame(), then
+# lap(name) after each stage, so every stage's time is the time since the
+# previous lap; AI searches are logged with their SearchStats counters.
+# Nothing here imports pygame.
+
+FRAME_SECTIONS = ['events', 'ai', 'draw_grid', 'draw_scores', 'spawn', 'flip']
+SEARCH_FIELDS = ['side', 'book', 'nodes', 'depth', 'tt_hits', 'tt_cutoffs', 'cutoffs', 'search_ms']
+OVERLAY_INTERVAL = 30  # Frames between overlay updates, so the numbers stay readable
+OVERLAY_LABELS = {'events': 'evt', 'ai': 'ai', 'draw_grid': 'grid', 'draw_scores': 'text',
+                  'spawn': 'spawn', 'flip': 'flip'}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class FrameProfiler:
+    def __init__(self):
+        self.frames = []  # One dict per frame: section -> ms, plus 'total'
+        self.searches = []  # One dict per finished AI search, with the frame it arrived in
+        self.current = None
+        self.last_lap = 0.0
+        self.overlay = []
+        self.startup = {}  # First frame of each kind -> ms after launch
+
+    def start_frame(self):
+        self.current = {}
+        self.frame_start = self.last_lap = time.perf_counter()
+
+    def lap(self, section):
+        now = time.perf_counter()
+        self.current[section] = self.current.get(section, 0.0) + (now - self.last_lap) * 1000
+        self.last_lap = now
+
+    def end_frame(self):
+        # Call before waiting for the next frame, so the wait is not counted
+        self.current['total'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames.append(self.current)
+        if len(self.frames) % OVERLAY_INTERVAL == 0:
+            self.overlay = self.overlay_lines()
+
+    def record_search(self, side, stats):
+        self.searches.append({
+            'frame': len(self.frames),
+            'side': side,
+            'book': int(stats.book_move),
+            'nodes': stats.nodes,
+            'depth': stats.depth,
+            'tt_hits': stats.tt_hits,
+            'tt_cutoffs': stats.tt_cutoffs,
+            'cutoffs': stats.cutoffs,
+            'search_ms': round(stats.elapsed * 1000, 3),
+        })
+
+    def summary(self):
+        # Mean, 95th percentile and worst time per section, in ms
+        result = {}
+        for section in FRAME_SECTIONS + ['total']:
+            values = [frame.get(section, 0.0) for frame in self.frames]
+            result[section] = {
+                'mean': sum(values) / len(values) if values else 0.0,
+                'p95': percentile(values, 0.95),
+                'max': max(values, default=0.0),
+            }
+        if self.searches:
+            result['search'] = {
+                'count': len(self.searches),
+                'mean_nodes': sum(s['nodes'] for s in self.searches) / len(self.searches),
+                'mean_depth': sum(s['depth'] for s in self.searches) / len(self.searches),
+            }
+        if self.startup:
+            result['first_frame_ms'] = self.startup
+        return result
+
+    def overlay_lines(self):
+        recent = self.frames[-OVERLAY_INTERVAL:]
+        totals = [frame['total'] for frame in recent]
+        # Mean/p95 frame time, then mean ms per stage
+        lines = [f"frame {sum(totals) / len(totals):.1f}/{percentile(totals, 0.95):.1f} ms"]
+        for first, second in (('events', 'ai'), ('draw_grid', 'draw_scores'), ('spawn', 'flip')):
+            a = sum(frame.get(first, 0.0) for frame in recent) / len(recent)
+            b = sum(frame.get(second, 0.0) for frame in recent) / len(recent)
+            lines.append(f"{OVERLAY_LABELS[first]} {a:.2f} {OVERLAY_LABELS[second]} {b:.2f}")
+        if self.searches:
+            last = self.searches[-1]
+            lines.append("ai book move" if last['book'] else f"ai {last['nodes']} nodes d{last['depth']}")
+        return lines
+
+    def export(self, path):
+        # JSON (frames, searches and the summary) or, for any other extension,
+        # CSV with one row per frame and the counters of any search that
+        # finished in that frame
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'frames': self.frames, 'searches': self.searches, 'summary': self.summary()}, f)
+            return
+        searches = {search['frame']: search for search in self.searches}
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + FRAME_SECTIONS + ['total'] + SEARCH_FIELDS)
+            for number, frame in enumerate(self.frames):
+                search = searches.get(number)
+                writer.writerow([number] + [f"{frame.get(section, 0.0):.3f}" for section in FRAME_SECTIONS]
+                                + [f"{frame['total']:.3f}"]
+                                + [search[field] if search else '' for field in SEARCH_FIELDS])
@@ -0,0 +1,214 @@
+import pygame
+
+from game_state import AI, EMPTY, PLAYER
+
+# Colors
+PINK = (255, 182, 193)
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)  # Human player color
+PURPLE = (128, 0, 128)  # AI color
+GREEN = (0, 255, 0)  # AI2 color (AI vs AI)
+YELLOW = (255, 255, 0)  # Power-up color
+RED = (255, 0, 0)  # Freeze power-up color
+BLUE = (0, 0, 255)  # Bonus power-up color
+WALL_COLOR = (100, 100, 100)  # Dark gray for walls
+WALL_BORDER_COLOR = (50, 50, 50)  # Darker border for walls
+PANEL_COLOR = (50, 50, 50)
+
+SCORE_PANEL_WIDTH = 200  # Width of the score panel
+MIN_TILE_BORDER_SIZE = 8  # Smaller tiles are drawn without borders
+TEXT_CACHE_SIZE = 512  # Rendered strings kept before the cache is emptied
+
+# Palette for drawing the whole board at once from the cell buffer
+TILE_PALETTE = [PINK, BLACK, PURPLE] + [PINK] * 253
+
+
+def draw_power_up(surface, x, y, power_type, tile_size):
+    center_x = x * tile_size + tile_size // 2
+    center_y = y * tile_size + tile_size // 2
+    arm = min(5, tile_size // 8)
+    if power_type == 'freeze':
+        pygame.draw.circle(surface, RED, (center_x, center_y), tile_size // 3)
+        pygame.draw.line(surface, WHITE, (center_x - arm, center_y), (center_x + arm, center_y), 2)
+        pygame.draw.line(surface, WHITE, (center_x, center_y - arm), (center_x, center_y + arm), 2)
+    else:  # bonus
+        pygame.draw.rect(surface, BLUE, (center_x - tile_size // 3, center_y - tile_size // 3,
+                                         tile_size // 1.5, tile_size // 1.5))
+        pygame.draw.line(surface, WHITE, (center_x - arm, center_y), (center_x + arm, center_y), 2)
+
+
+class Renderer:
+    # Draws a GameState with dirty rectangles. Walls and the static part of
+    # the score panel are drawn once into a cached background; tiles, pieces
+    # and power-ups are pre-rendered sprites; text surfaces are cached by
+    # string. After the first frame only the cells the state reports as
+    # changed and the panel lines whose text changed are redrawn, and draw()
+    # returns those rects for pygame.display.update().
+
+    def __init__(self, screen, tile_size, font, small_font):
+        self.screen = screen
+        self.tile_size = tile_size
+        self.font = font
+        self.small_font = small_font
+        self.width, self.height = screen.get_size()
+        self.panel_x = self.width - SCORE_PANEL_WIDTH
+        self.text_cache = {}
+        self.panel_text = {}  # Panel line -> (text, rect on screen)
+        self.background = None
+        self.needs_full_redraw = True
+        self.profiler = None  # Optional profiling.FrameProfiler; draw() laps its stages
+        self.overlay = []  # Extra panel lines (profiling numbers) shown under the time
+        self._build_sprites()
+
+    def invalidate(self):
+        # Call after something else has drawn over the window
+        self.needs_full_redraw = True
+
+    def render_text(self, font, text, color):
+        key = (font, text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            surface = font.render(text, True, color)
+            self.text_cache[key] = surface
+        return surface
+
+    def _build_sprites(self):
+        size = self.tile_size
+
+        def tile(color):
+            surface = pygame.Surface((size, size))
+            surface.fill(color)
+            if size >= MIN_TILE_BORDER_SIZE:
+                pygame.draw.rect(surface, WHITE, surface.get_rect(), 2)
+            return surface
+
+        self.tiles = {EMPTY: tile(PINK), PLAYER: tile(BLACK), AI: tile(PURPLE)}
+
+        center = size // 2
+        arm = min(10, size // 4)
+        player = pygame.Surface((size, size))
+        player.fill(BLACK)
+        pygame.draw.circle(player, WHITE, (center, center), size // 4)
+        ai = pygame.Surface((size, size))
+        ai.fill(PURPLE)
+        pygame.draw.line(ai, WHITE, (center - arm, center - arm), (center + arm, center + arm), 2)
+        pygame.draw.line(ai, WHITE, (center + arm, center - arm), (center - arm, center + arm), 2)
+        self.pieces = {PLAYER: player, AI: ai}
+
+        self.power_up_sprites = {}
+        for power_type in ('freeze', 'bonus'):
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            draw_power_up(surface, 0, 0, power_type, size)
+            self.power_up_sprites[power_type] = surface
+
+    def _build_background(self, state):
+        size = self.tile_size
+        background = pygame.Surface((self.width, self.height))
+        background.fill(PINK)
+
+        # Walls around the grid
+        walls = [(0, col) for col in range(state.width)] + [(state.height - 1, col) for col in range(state.width)]
+        walls += [(row, 0) for row in range(1, state.height - 1)]
+        walls += [(row, state.width - 1) for row in range(1, state.height - 1)]
+        for row, col in walls:
+            rect = pygame.Rect(col * size, row * size, size, size)
+            pygame.draw.rect(background, WALL_COLOR, rect)
+            pygame.draw.rect(background, WALL_BORDER_COLOR, rect, max(1, min(3, size // 2)))
+
+        # Score panel with the power-up legend and controls
+        x = self.panel_x
+        pygame.draw.rect(background, PANEL_COLOR, pygame.Rect(x, 0, SCORE_PANEL_WIDTH, self.height))
+        background.blit(self.render_text(self.font, "Power-ups:", WHITE), (x + 20, 120))
+        pygame.draw.circle(background, RED, (x + 40, 170), 10)
+        background.blit(self.render_text(self.small_font, "Freeze", WHITE), (x + 60, 165))
+        pygame.draw.rect(background, BLUE, (x + 30, 190, 20, 20))
+        background.blit(self.render_text(self.small_font, "Bonus", WHITE), (x + 60, 195))
+        background.blit(self.render_text(self.font, "Controls:", WHITE), (x + 20, 250))
+        for i, text in enumerate(["W - Move Up", "A - Move Left", "S - Move Down", "D - Move Right"]):
+            background.blit(self.render_text(self.small_font, text, WHITE), (x + 20, 290 + 30 * i))
+        self.background = background
+
+    def draw(self, state, remaining_time):
+        if self.needs_full_redraw:
+            rects = self.draw_everything(state, remaining_time)
+            if self.profiler:
+                self.profiler.lap('draw_grid')
+            return rects
+        rects = self.draw_grid(state)
+        if self.profiler:
+            self.profiler.lap('draw_grid')
+        rects += self.draw_scores(state, remaining_time)
+        if self.profiler:
+            self.profiler.lap('draw_scores')
+        return rects
+
+    def draw_everything(self, state, remaining_time):
+        if self.background is None:
+            self._build_background(state)
+        self.screen.blit(self.background, (0, 0))
+        size = self.tile_size
+        inside = pygame.Rect(size, size, (state.width - 2) * size, (state.height - 2) * size)
+        if size >= MIN_TILE_BORDER_SIZE:
+            for row in range(1, state.height - 1):
+                for col in range(1, state.width - 1):
+                    self.screen.blit(self.tiles[state.cells[row * state.width + col]], (col * size, row * size))
+        else:
+            # Tiny tiles have no borders: show the cell buffer as an 8-bit
+            # image, one pixel per cell, and scale it up in one call
+            cells = pygame.image.frombuffer(state.cells, (state.width, state.height), 'P')
+            cells.set_palette(TILE_PALETTE)
+            scaled = pygame.transform.scale(cells, (state.width * size, state.height * size))
+            self.screen.blit(scaled, inside.topleft, inside)
+        for index in state.power_up_cells():
+            self.draw_cell(state, index)
+        for side in (PLAYER, AI):
+            x, y = state.positions[side]
+            self.draw_cell(state, y * state.width + x)
+        state.drain_changes()
+        self.panel_text = {}
+        self.draw_scores(state, remaining_time)
+        self.needs_full_redraw = False
+        return [self.screen.get_rect()]
+
+    def draw_cell(self, state, index):
+        size = self.tile_size
+        x = index % state.width
+        y = index // state.width
+        position = (x * size, y * size)
+        self.screen.blit(self.tiles[state.cells[index]], position)
+        power_type = state.power_up_at(index)
+        if power_type:
+            self.screen.blit(self.power_up_sprites[power_type], position)
+        for side in (PLAYER, AI):
+            if state.positions[side][0] == x and state.positions[side][1] == y:
+                self.screen.blit(self.pieces[side], position)
+        return pygame.Rect(position, (size, size))
+
+    def draw_grid(self, state):
+        # Redraw only the cells touched since the last frame
+        return [self.draw_cell(state, index) for index in set(state.drain_changes())]
+
+    def draw_scores(self, state, remaining_time):
+        x = self.panel_x + 20
+        lines = [
+            ('player', f"Player: {state.player_score}", (x, 20)),
+            ('ai', f"AI: {state.ai_score}", (x, 60)),
+            ('time', f"Time: {int(remaining_time)}s", (x, 420)),
+        ]
+        for number, text in enumerate(self.overlay):
+            lines.append((f'overlay{number}', text, (x - 10, 460 + 24 * number)))
+        rects = []
+        for name, text, position in lines:
+            previous = self.panel_text.get(name)
+            if previous is not None and previous[0] == text:
+                continue
+            if previous is not None:
+                # Restore the panel behind the old text before drawing the new one
+                self.screen.blit(self.background, previous[1], previous[1])
+            font = self.small_font if name.startswith('overlay') else self.font
+            rect = self.screen.blit(self.render_text(font, text, WHITE), position)
+            self.panel_text[name] = (text, rect)
+            rects.append(rect.union(previous[1]) if previous is not None else rect)
+        return rects
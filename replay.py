@@ -0,0 +1,235 @@
+import argparse
+import cProfile
+import pstats
+import struct
+import time
+
+from game_state import POWER_UPS, SIDE_NAMES, GameState
+from search import MoveOrdering, SearchStats, TranspositionTable, get_best_move, iterative_deepening
+
+# Binary game logs and a headless replayer.
+#
+# A log is a fixed header followed by fixed-size event records, written as
+# the game is played (GameState.recorder), so a crash still leaves every
+# event up to that point on disk. Spawns are logged with their square and
+# type, so replaying needs neither the seed nor the clock and reproduces the
+# game exactly.
+#   python replay.py games/*.tvl               - re-simulate and verify logs
+#   python replay.py game.tvl --ply 30 --depth 6 [--profile]
+#                                              - re-run the search at a ply
+
+LOG_MAGIC = b'TVLG'
+LOG_VERSION = 2
+# magic, version, width, height, seed (-1: unseeded), freeze ticks, game ticks
+HEADER = struct.Struct('<4sBHHqHI')
+# kind, tick, then three fields that depend on the kind:
+#   MOVE      side, x, y
+#   SPAWN     power-up type, row, col
+#   POWER_UP  side, power-up type, 0   (picked up by the move just logged)
+#   END       0, 0, 0   (followed by END_SCORES)
+EVENT = struct.Struct('<BIBHH')
+# Final player and ai scores, after the END record; too large for the
+# 16-bit event fields on big boards
+END_SCORES = struct.Struct('<ii')
+MOVE = 1
+SPAWN = 2
+POWER_UP = 3
+END = 4
+READ_CHUNK = 4096 * EVENT.size
+
+
+class EventLog:
+    # Writes one game's events to path. Assign to state.recorder before the
+    # first move and call close(state) when the game ends.
+
+    def __init__(self, path, state, seed=None, game_ticks=0):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(LOG_MAGIC, LOG_VERSION, state.width, state.height,
+                                    -1 if seed is None else seed, state.freeze_length, game_ticks))
+
+    def move(self, tick, side, move):
+        self.file.write(EVENT.pack(MOVE, tick, side, move[0], move[1]))
+
+    def spawn(self, tick, row, col, power_type):
+        self.file.write(EVENT.pack(SPAWN, tick, POWER_UPS.index(power_type), row, col))
+
+    def power_up(self, tick, side, power_type):
+        self.file.write(EVENT.pack(POWER_UP, tick, side, POWER_UPS.index(power_type), 0))
+
+    def close(self, state=None):
+        if state is not None:
+            self.file.write(EVENT.pack(END, state.tick, 0, 0, 0))
+            self.file.write(END_SCORES.pack(state.player_score, state.ai_score))
+        self.file.close()
+
+
+def read_header(file):
+    data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("truncated game log header")
+    magic, version, width, height, seed, freeze_ticks, game_ticks = HEADER.unpack(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"not a version {LOG_VERSION} game log")
+    return {'width': width, 'height': height, 'seed': None if seed < 0 else seed,
+            'freeze_ticks': freeze_ticks, 'game_ticks': game_ticks}
+
+
+def read_events(file):
+    # Stream the events after the header; a torn last record is ignored.
+    # END comes back as (END, tick, 0, player score, ai score).
+    while True:
+        data = file.read(READ_CHUNK)
+        if not data:
+            return
+        usable = len(data) - len(data) % EVENT.size
+        for index, event in enumerate(EVENT.iter_unpack(data[:usable])):
+            if event[0] == END:
+                # The last record; its scores follow it
+                start = (index + 1) * EVENT.size
+                scores = data[start:start + END_SCORES.size]
+                scores += file.read(END_SCORES.size - len(scores))
+                if len(scores) == END_SCORES.size:
+                    yield (END, event[1], 0) + END_SCORES.unpack(scores)
+                return
+            yield event
+        if usable < len(data):
+            return
+
+
+class Replay:
+    # Rebuilds a logged game on a fresh GameState, event by event
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.header = read_header(self.file)
+        self.events = read_events(self.file)
+        self.pending = None  # Event read ahead by peek()
+        self.state = GameState(self.header['width'], self.header['height'], self.header['seed'],
+                               self.header['freeze_ticks'])
+        self.ply = 0  # Moves applied so far
+        self.finished = False
+        self.last_power_up = None
+
+    def close(self):
+        self.file.close()
+
+    def advance_to(self, tick):
+        state = self.state
+        if tick < state.tick:
+            raise ValueError(f"event at tick {tick} after tick {state.tick}")
+        while state.tick < tick:
+            state.advance_tick()
+
+    def step(self):
+        # Apply the next event and return it, or None at the end of the log
+        event = self.peek()
+        self.pending = None
+        if event is None:
+            self.finished = True
+            return None
+        kind, tick, a, b, c = event
+        state = self.state
+        self.advance_to(tick)
+        if kind == MOVE:
+            if (b, c) not in state.get_valid_moves(a):
+                raise ValueError(f"illegal logged move {(b, c)} for {SIDE_NAMES.get(a)} at ply {self.ply}")
+            self.last_power_up = state.play_move((b, c), a)
+            self.ply += 1
+        elif kind == SPAWN:
+            state.place_power_up(b, c, POWER_UPS[a])
+        elif kind == POWER_UP:
+            if self.last_power_up != POWER_UPS[b]:
+                raise ValueError(f"logged {POWER_UPS[b]} pickup does not match the replayed move at ply {self.ply}")
+        elif kind == END:
+            if (state.player_score, state.ai_score) != (b, c):
+                raise ValueError(f"replayed scores {state.player_score}-{state.ai_score} != logged {b}-{c}")
+            self.finished = True
+        else:
+            raise ValueError(f"unknown event kind {kind}")
+        return event
+
+    def run(self, until_ply=None):
+        # Fast-forward to the end, or to just before move number until_ply;
+        # returns the number of events applied
+        applied = 0
+        while not self.finished:
+            if until_ply is not None and self.ply >= until_ply:
+                # Stop before the move, but after everything logged ahead of it
+                event = self.peek()
+                if event is None or event[0] == MOVE:
+                    break
+            if self.step() is None:
+                break
+            applied += 1
+        return applied
+
+    def peek(self):
+        if self.pending is None:
+            self.pending = next(self.events, None)
+        return self.pending
+
+
+def replay_logs(paths):
+    events = 0
+    start = time.perf_counter()
+    for path in paths:
+        replay = Replay(path)
+        try:
+            events += replay.run()
+        finally:
+            replay.close()
+    elapsed = time.perf_counter() - start
+    print(f"replayed {len(paths)} games, {events} events in {elapsed:.3f}s "
+          f"({len(paths) / elapsed:,.0f} games/s, {events / elapsed:,.0f} events/s); all logs verified")
+
+
+def analyze_ply(path, ply, depth, budget_ms, profile):
+    # Rebuild the position before move number ply and search it again for
+    # the side that moved there
+    replay = Replay(path)
+    replay.run(until_ply=ply)
+    event = replay.peek()
+    replay.close()
+    if event is None or event[0] != MOVE:
+        raise SystemExit(f"the log has only {replay.ply} moves")
+    _, tick, side, x, y = event
+    state = replay.state
+    stats = SearchStats()
+    tt = TranspositionTable()
+    ordering = MoveOrdering()
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    if budget_ms:
+        move = iterative_deepening(state, side, budget_ms, stats, tt, ordering=ordering)
+    else:
+        move = get_best_move(state, side, depth, stats, tt, ordering=ordering)
+        stats.depth = depth
+    if profiler:
+        profiler.disable()
+    print(f"ply {ply} (tick {tick}), {SIDE_NAMES[side]} to move, score {state.player_score}-{state.ai_score}")
+    print(f"logged move:   {(x, y)}")
+    print(f"searched move: {move} at depth {stats.depth}")
+    print(f"nodes: {stats.nodes:,} in {stats.elapsed:.3f}s ({stats.nodes_per_second():,.0f} nodes/s), "
+          f"branching {stats.branching_factor():.2f}, cutoffs {stats.cutoff_rate():.1%}, "
+          f"TT hit rate {tt.hit_rate():.1%}")
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and analyze binary game logs")
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--ply', type=int, default=None, help="re-run the search before this move (first log only)")
+    parser.add_argument('--depth', type=int, default=4, help="search depth for --ply")
+    parser.add_argument('--budget-ms', type=float, default=None, help="iterative deepening budget for --ply")
+    parser.add_argument('--profile', action='store_true', help="profile the --ply search with cProfile")
+    args = parser.parse_args()
+    if args.ply is not None:
+        analyze_ply(args.logs[0], args.ply, args.depth, args.budget_ms, args.profile)
+    else:
+        replay_logs(args.logs)
+
+
+if __name__ == "__main__":
+    main()
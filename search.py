@@ -0,0 +1,487 @@
+import json
+import time
+
+from game_state import AI, BONUS_POWER_UP, EMPTY, FREEZE_POWER_UP, PLAYER, other_side
+
+# Evaluation weights. The defaults are the original hand-picked values;
+# tune.py searches for better ones and writes them to a weights file that
+# load_weights() installs here.
+# Weight of one point of score difference in the leaf evaluation
+MATERIAL_WEIGHT = 4
+# Square evaluation: what the square holds, and each enemy tile next to it
+ENEMY_TILE_WEIGHT = 3
+EMPTY_TILE_WEIGHT = 1
+BONUS_WEIGHT = 2
+FREEZE_WEIGHT = -2
+ADJACENT_ENEMY_WEIGHT = 1
+DEFAULT_WEIGHTS = {'material': 4, 'enemy_tile': 3, 'empty_tile': 1, 'bonus': 2, 'freeze': -2, 'adjacent_enemy': 1}
+WEIGHTS_PATH = 'weights.json'
+# Weights are rounded to multiples of 1/WEIGHT_STEPS, so evaluation sums are
+# exact in floating point (and the NumPy batch evaluation matches bit for bit)
+WEIGHT_STEPS = 64
+
+
+def set_weights(weights):
+    # Install evaluation weights (a dict with DEFAULT_WEIGHTS' keys; missing
+    # keys take the default)
+    global MATERIAL_WEIGHT, ENEMY_TILE_WEIGHT, EMPTY_TILE_WEIGHT, BONUS_WEIGHT, FREEZE_WEIGHT, ADJACENT_ENEMY_WEIGHT
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"unknown evaluation weights: {', '.join(sorted(unknown))}")
+    weights = {name: round_weight(value) for name, value in {**DEFAULT_WEIGHTS, **weights}.items()}
+    MATERIAL_WEIGHT = weights['material']
+    ENEMY_TILE_WEIGHT = weights['enemy_tile']
+    EMPTY_TILE_WEIGHT = weights['empty_tile']
+    BONUS_WEIGHT = weights['bonus']
+    FREEZE_WEIGHT = weights['freeze']
+    ADJACENT_ENEMY_WEIGHT = weights['adjacent_enemy']
+
+
+def round_weight(value):
+    value = round(value * WEIGHT_STEPS) / WEIGHT_STEPS
+    return int(value) if value == int(value) else value
+
+
+def current_weights():
+    return {'material': MATERIAL_WEIGHT, 'enemy_tile': ENEMY_TILE_WEIGHT, 'empty_tile': EMPTY_TILE_WEIGHT,
+            'bonus': BONUS_WEIGHT, 'freeze': FREEZE_WEIGHT, 'adjacent_enemy': ADJACENT_ENEMY_WEIGHT}
+
+
+def load_weights(path):
+    # Install the weights saved in a weights file ({"weights": {...}})
+    with open(path) as f:
+        weights = json.load(f)['weights']
+    set_weights(weights)
+    return weights
+
+
+# Transposition table bound types
+EXACT = 0
+LOWER = 1  # Value is at least this (search failed high)
+UPPER = 2  # Value is at most this (search failed low)
+
+
+class TranspositionTable:
+    # Fixed-size table of 2-slot buckets. Slot 0 is depth-preferred: it is
+    # only replaced by an equal or deeper search of any position, or by an
+    # entry left over from an earlier move. Slot 1 is always-replace, so
+    # recent shallow results still get cached.
+
+    def __init__(self, size_bits=16):
+        self.mask = (1 << size_bits) - 1
+        # Each entry: (key, depth, flag, value, best move, generation)
+        self.entries = [None] * (2 << size_bits)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        # Entries from earlier searches stay usable but lose depth priority
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+
+    def probe(self, key):
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        entry = self.entries[slot]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self.entries[slot + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        self.stores += 1
+        slot = (key & self.mask) << 1
+        old = self.entries[slot]
+        if (old is None or old[0] == key or depth >= old[1]
+                or old[5] != self.generation):
+            self.entries[slot] = (key, depth, flag, value, move, self.generation)
+        else:
+            self.entries[slot + 1] = (key, depth, flag, value, move, self.generation)
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+# How often (in nodes) the search looks at the clock
+TIME_CHECK_INTERVAL = 64
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.tt_hits = 0  # Transposition table probes that found the position
+        self.tt_cutoffs = 0  # Nodes answered straight from the transposition table
+        self.depth = 0  # Deepest fully completed iteration
+        self.deadline = None  # perf_counter() time at which the search must stop
+        self.stop = None  # Optional Event another thread/process sets to cancel the search
+        self.book_move = False  # Answered from the opening book without searching
+        # Score the children of depth-1 nodes in one NumPy batch
+        # (board_ops.evaluate_children) instead of one evaluate() each
+        self.batch_leaves = False
+        # Pruning instrumentation, counted over interior nodes
+        self.expanded = 0  # Nodes whose children were searched
+        self.children = 0  # Children actually searched (after cutoffs)
+        self.cutoffs = 0  # Nodes that stopped early on a beta cutoff
+        self.first_move_cutoffs = 0  # ... of which the first move was enough
+
+    def merge(self, other):
+        # Add the counters of a search run elsewhere (a parallel worker)
+        self.nodes += other.nodes
+        self.tt_hits += other.tt_hits
+        self.tt_cutoffs += other.tt_cutoffs
+        self.expanded += other.expanded
+        self.children += other.children
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def branching_factor(self):
+        # Average number of moves searched per interior node; the better the
+        # ordering, the closer this gets to 1
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def cutoff_rate(self):
+        return self.cutoffs / self.expanded if self.expanded else 0.0
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+
+def evaluate_position(state, pos, side):
+    return evaluate_square(state, pos[1] * state.width + pos[0], side)
+
+
+def evaluate_square(state, index, side):
+    # evaluate_position for a cell index; the search calls this directly
+    cells = state.cells
+    enemy = other_side(side)
+    score = 0
+    # Check the tile at the position
+    tile = cells[index]
+    if tile == enemy:
+        score += ENEMY_TILE_WEIGHT  # Capturing enemy tiles is worth most
+    elif tile == EMPTY:
+        score += EMPTY_TILE_WEIGHT
+
+    # Check for power-ups
+    power_up = state.power_grid[index]
+    if power_up == BONUS_POWER_UP:
+        score += BONUS_WEIGHT
+    elif power_up == FREEZE_POWER_UP:
+        score += FREEZE_WEIGHT  # Negative: avoid freeze power-ups
+
+    # Check surrounding tiles for strategic value; index is always a
+    # playable tile, so all four neighbours are on the board
+    for offset in state.tables['adjacent']:
+        if cells[index + offset] == enemy:
+            score += ADJACENT_ENEMY_WEIGHT  # Bonus for being near enemy tiles
+    return score
+
+
+def best_square(state, side):
+    # Value of the best square the side can step on next (0 with no moves)
+    origin = state.piece_cells[side]
+    blocked = state.blocked_cell(side)
+    best = None
+    for offset in state.move_offsets(side):
+        target = origin + offset
+        if target != blocked:
+            score = evaluate_square(state, target, side)
+            if best is None or score > best:
+                best = score
+    return 0 if best is None else best
+
+
+def evaluate(state):
+    # Static evaluation from the AI's point of view: score difference plus
+    # how good each side's next square looks
+    score = MATERIAL_WEIGHT * (state.scores[AI] - state.scores[PLAYER])
+    return score + best_square(state, AI) - best_square(state, PLAYER)
+
+
+def leaf_values(state, side, moves, blocked):
+    # {move: evaluate() after the move} for side's moves, batched with NumPy
+    from board_ops import evaluate_children
+    moves = [move for move in moves if move != blocked]
+    return dict(zip(moves, evaluate_children(state, side, moves).tolist()))
+
+
+def order_moves(moves, first):
+    # Search the remembered best move first
+    if first in moves and moves[0] != first:
+        moves.remove(first)
+        moves.insert(0, first)
+    return moves
+
+
+# Killer moves remembered per ply
+KILLER_SLOTS = 2
+
+
+class MoveOrdering:
+    # Killer and history heuristics for one player's searches. Moves (cell
+    # indices, as everywhere in the search) are tried in this order: the
+    # transposition table move, captures of enemy tiles and bonus power-ups,
+    # the killers of this ply (quiet moves that caused a cutoff in a
+    # sibling), then the rest by history score (how often and how deep a
+    # move caused cutoffs so far). Keep one instance per game next to the
+    # TranspositionTable.
+
+    def __init__(self):
+        self.killers = {}  # Ply (undo stack depth) -> recent cutoff moves
+        self.history = {}  # (side, move) -> cutoff score
+
+    def new_search(self):
+        # Older history still helps, but recent cutoffs should count for more
+        for key in self.history:
+            self.history[key] >>= 1
+
+    def clear(self):
+        self.killers = {}
+        self.history = {}
+
+    def sort(self, state, moves, side, ply, tt_move=None):
+        cells = state.cells
+        enemy = other_side(side)
+        power_grid = state.power_grid
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def priority(move):
+            tactical = 0
+            if cells[move] == enemy:
+                tactical += 1
+            if power_grid[move] == BONUS_POWER_UP:
+                tactical += 1
+            killer = KILLER_SLOTS - killers.index(move) if move in killers else 0
+            return tactical, killer, history.get((side, move), 0)
+
+        moves.sort(key=priority, reverse=True)
+        return order_moves(moves, tt_move)
+
+    def record_cutoff(self, state, move, side, ply, depth):
+        self.history[(side, move)] = self.history.get((side, move), 0) + depth * depth
+        if state.cells[move] == other_side(side):
+            return  # Captures are ordered early anyway
+        killers = self.killers.setdefault(ply, [])
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[KILLER_SLOTS:]
+
+
+def minimax(state, depth, alpha, beta, side, stats, tt=None, ordering=None):
+    stats.nodes += 1
+    if stats.deadline is not None and stats.nodes % TIME_CHECK_INTERVAL == 0:
+        if time.perf_counter() >= stats.deadline or (stats.stop is not None and stats.stop.is_set()):
+            raise SearchTimeout()
+    if depth == 0 or state.game_over():
+        return evaluate(state)
+
+    # Moves are cell indices (piece cell + offsets from the shared move
+    # table); the cell holding the other piece is skipped in the loops
+    origin = state.piece_cells[side]
+    offsets = state.move_offsets(side)
+    blocked = state.blocked_cell(side)
+    if len(offsets) == 1 and origin + offsets[0] == blocked:
+        return evaluate(state)
+
+    key = 0
+    tt_move = None
+    if tt is not None:
+        key = state.position_key(side)
+        entry = tt.probe(key)
+        if entry is not None:
+            stats.tt_hits += 1
+            _, entry_depth, flag, value, tt_move, _ = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    stats.tt_cutoffs += 1
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if beta <= alpha:
+                    stats.tt_cutoffs += 1
+                    return value
+    # Interior nodes need a list they can reorder; leaves (best_square)
+    # walk the shared offsets without allocating
+    ply = len(state.undo_stack)
+    valid_moves = [origin + offset for offset in offsets]
+    if ordering is not None:
+        ordering.sort(state, valid_moves, side, ply, tt_move)
+    else:
+        order_moves(valid_moves, tt_move)
+    alpha_orig = alpha
+    beta_orig = beta
+    best_move = None
+    cutoff_move = None
+    searched = 0
+    leaves = leaf_values(state, side, valid_moves, blocked) if depth == 1 and stats.batch_leaves else None
+
+    if side == AI:
+        max_eval = float('-inf')
+        for move in valid_moves:
+            if move == blocked:
+                continue
+            if leaves is None:
+                state.make_move_index(move, side)
+                eval = minimax(state, depth - 1, alpha, beta, PLAYER, stats, tt, ordering)
+                state.unmake_move()
+            else:
+                stats.nodes += 1
+                eval = leaves[move]
+            searched += 1
+            if eval > max_eval:
+                max_eval = eval
+                best_move = move
+            alpha = max(alpha, eval)
+            if beta <= alpha:
+                cutoff_move = move
+                break
+        best = max_eval
+    else:
+        min_eval = float('inf')
+        for move in valid_moves:
+            if move == blocked:
+                continue
+            if leaves is None:
+                state.make_move_index(move, side)
+                eval = minimax(state, depth - 1, alpha, beta, AI, stats, tt, ordering)
+                state.unmake_move()
+            else:
+                stats.nodes += 1
+                eval = leaves[move]
+            searched += 1
+            if eval < min_eval:
+                min_eval = eval
+                best_move = move
+            beta = min(beta, eval)
+            if beta <= alpha:
+                cutoff_move = move
+                break
+        best = min_eval
+
+    stats.expanded += 1
+    stats.children += searched
+    if cutoff_move is not None:
+        stats.cutoffs += 1
+        if searched == 1:
+            stats.first_move_cutoffs += 1
+        if ordering is not None:
+            ordering.record_cutoff(state, cutoff_move, side, ply, depth)
+
+    if tt is not None:
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, depth, flag, best, best_move)
+    return best
+
+
+def get_best_move(state, side=AI, depth=2, stats=None, tt=None, first=None, ordering=None):
+    # Returns the best move as an (x, y) square; first is an (x, y) square
+    # to try before anything else
+    if stats is None:
+        stats = SearchStats()
+    start = time.perf_counter()
+    is_ai = side == AI
+    best_score = float('-inf') if is_ai else float('inf')
+    best_move = None
+    alpha = float('-inf')
+    beta = float('inf')
+
+    origin = state.piece_cells[side]
+    blocked = state.blocked_cell(side)
+    valid_moves = [origin + offset for offset in state.move_offsets(side) if origin + offset != blocked]
+    tt_move = None
+    if tt is not None:
+        tt.new_search()
+        entry = tt.probe(state.position_key(side))
+        if entry is not None:
+            tt_move = entry[4]
+    if ordering is not None:
+        ordering.new_search()
+        ordering.sort(state, valid_moves, side, len(state.undo_stack), tt_move)
+    else:
+        order_moves(valid_moves, tt_move)
+    if first is not None:
+        order_moves(valid_moves, first[1] * state.width + first[0])
+
+    for move in valid_moves:
+        state.make_move_index(move, side)
+        score = minimax(state, depth - 1, alpha, beta, other_side(side), stats, tt, ordering)
+        state.unmake_move()
+
+        if is_ai:
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, best_score)
+        else:
+            if score < best_score:
+                best_score = score
+                best_move = move
+            beta = min(beta, best_score)
+
+    if tt is not None and best_move is not None:
+        tt.store(state.position_key(side), depth, EXACT, best_score, best_move)
+    stats.elapsed += time.perf_counter() - start
+    return None if best_move is None else (best_move % state.width, best_move // state.width)
+
+
+def iterative_deepening(state, side=AI, budget_ms=100, stats=None, tt=None, max_depth=64, ordering=None,
+                        search=get_best_move):
+    # Search depth 1, 2, 3, ... until the time budget runs out and return the
+    # best move of the deepest iteration that finished. Each iteration starts
+    # with the previous best move, so cutoffs come early. search runs one
+    # iteration (get_best_move, or ParallelSearch.get_best_move).
+    if stats is None:
+        stats = SearchStats()
+    start = time.perf_counter()
+    elapsed_before = stats.elapsed
+    undo_depth = len(state.undo_stack)
+    best_move = None
+
+    valid_moves = state.get_valid_moves(side)
+    if len(valid_moves) <= 1:
+        stats.depth = 1
+        return valid_moves[0] if valid_moves else None
+
+    for depth in range(1, max_depth + 1):
+        # Depth 1 always completes so there is a move to return
+        stats.deadline = start + budget_ms / 1000 if depth > 1 else None
+        try:
+            move = search(state, side, depth, stats, tt, best_move, ordering)
+        except SearchTimeout:
+            # Unwind the moves the aborted iteration left on the board
+            while len(state.undo_stack) > undo_depth:
+                state.unmake_move()
+            break
+        best_move = move
+        stats.depth = depth
+        if time.perf_counter() >= start + budget_ms / 1000:
+            break
+
+    stats.deadline = None
+    stats.elapsed = elapsed_before + time.perf_counter() - start
+    return best_move
@@ -0,0 +1,173 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from game_state import AI, PLAYER, GameConfig, other_side
+from search import (DEFAULT_WEIGHTS, MoveOrdering, TranspositionTable, current_weights, get_best_move,
+                    iterative_deepening, set_weights)
+
+# Headless AI-vs-AI games. Turns are counted in ticks, so a 30 second game
+# is config.game_ticks moves and runs as fast as the search allows.
+# Run with: python selfplay.py --games 1000
+
+AGENTS = ['minimax', 'mcts']
+MCTS_BUDGET_MS = 20  # Per-move budget of the MCTS agent when --budget-ms is not given
+_books = {}  # Opening books already mapped in this process, by path
+
+
+def play_game(seed, player_depth=2, ai_depth=2, config=None, budget_ms=None,
+              player_agent='minimax', ai_agent='minimax', record_dir=None, book_path=None, weights=None,
+              random_opening=0):
+    # With budget_ms set, both sides use iterative deepening under that time
+    # budget instead of a fixed depth (results then depend on machine speed).
+    # An 'mcts' agent always searches on a time budget. With record_dir set,
+    # the game is logged there as game-<seed>.tvl (see replay.py). With
+    # book_path set, minimax agents play book moves while the book has them.
+    # weights maps a side to its evaluation weights (see search.set_weights),
+    # for pitting two weight sets against each other; each side then keeps
+    # its own transposition table. The first random_opening ticks are random
+    # legal moves drawn from the game's seed, so a batch of tuning games does
+    # not replay one line over and over.
+    config = config or GameConfig()
+    ticks = config.game_ticks
+    spawn_chance = config.tick_power_up_chance
+    state = config.new_game(seed)
+    if record_dir:
+        from replay import EventLog
+        state.recorder = EventLog(os.path.join(record_dir, f"game-{seed}.tvl"), state, seed, ticks)
+    depths = {PLAYER: player_depth, AI: ai_depth}
+    agents = {PLAYER: player_agent, AI: ai_agent}
+    tt = TranspositionTable()
+    ordering = MoveOrdering()
+    tts = {PLAYER: TranspositionTable(), AI: tt} if weights else None
+    orderings = {PLAYER: MoveOrdering(), AI: ordering} if weights else None
+    saved_weights = current_weights()
+    book = None
+    if book_path:
+        if book_path not in _books:
+            from book import load_book
+            _books[book_path] = load_book(book_path)
+        book = _books[book_path]
+    book_moves = 0
+    playout_stats = None
+    if 'mcts' in agents.values():
+        import numpy as np
+        from mcts import PlayoutStats, mcts_best_move
+        rng = np.random.default_rng(seed)
+        playout_stats = PlayoutStats()
+    while state.tick < ticks and not state.game_over():
+        side = state.turn
+        if not state.frozen():
+            move = book.lookup(state, side) if book is not None and agents[side] == 'minimax' else None
+            if weights:
+                set_weights(weights.get(side) or saved_weights)
+                tt = tts[side]
+                ordering = orderings[side]
+            if state.tick < random_opening:
+                moves = state.get_valid_moves(side)
+                move = state.rng.choice(moves) if moves else None
+            elif move is not None:
+                book_moves += 1
+            elif agents[side] == 'mcts':
+                move = mcts_best_move(state, side, budget_ms or MCTS_BUDGET_MS, playout_stats,
+                                      ticks - state.tick, rng, spawn_chance=spawn_chance)
+            elif budget_ms:
+                move = iterative_deepening(state, side, budget_ms, tt=tt, max_depth=ticks - state.tick,
+                                             ordering=ordering)
+            else:
+                move = get_best_move(state, side, depths[side], tt=tt, ordering=ordering)
+            if move:
+                state.play_move(move, side)
+        state.turn = other_side(side)
+        state.advance_tick()
+        state.maybe_spawn_power_up(spawn_chance)
+    set_weights(saved_weights)
+    if state.recorder is not None:
+        state.recorder.close(state)
+    result = {'seed': seed, 'player_score': state.player_score, 'ai_score': state.ai_score, 'ticks': state.tick,
+              'book_moves': book_moves}
+    if playout_stats is not None:
+        result['playouts'] = playout_stats.playouts
+        result['playout_time'] = playout_stats.elapsed
+    return result
+
+
+def _play_game_args(args):
+    return play_game(*args)
+
+
+def run_tournament(games, seed=0, workers=None, player_depth=2, ai_depth=2, config=None, budget_ms=None,
+                   player_agent='minimax', ai_agent='minimax', record_dir=None, book_path=None, weights=None):
+    jobs = [(seed + i, player_depth, ai_depth, config, budget_ms, player_agent, ai_agent, record_dir, book_path,
+             weights) for i in range(games)]
+    chunksize = max(1, games // ((workers or multiprocessing.cpu_count()) * 8))
+    with multiprocessing.Pool(workers) as pool:
+        return list(pool.imap_unordered(_play_game_args, jobs, chunksize))
+
+
+def summarize(results, elapsed):
+    games = len(results)
+    ai_wins = sum(1 for r in results if r['ai_score'] > r['player_score'])
+    player_wins = sum(1 for r in results if r['player_score'] > r['ai_score'])
+    draws = games - ai_wins - player_wins
+    margin = sum(r['ai_score'] - r['player_score'] for r in results) / games
+    playout_time = sum(r.get('playout_time', 0.0) for r in results)
+    summary = {
+        'games': games,
+        'ai_win_rate': ai_wins / games,
+        'player_win_rate': player_wins / games,
+        'draw_rate': draws / games,
+        'mean_margin': margin,  # AI score minus player score
+        'games_per_sec': games / elapsed if elapsed > 0 else 0.0,
+        'book_moves_per_game': sum(r['book_moves'] for r in results) / games,
+    }
+    if playout_time > 0:
+        summary['playouts_per_sec'] = sum(r['playouts'] for r in results) / playout_time
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch AI-vs-AI self-play")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--player-depth', type=int, default=2)
+    parser.add_argument('--ai-depth', type=int, default=2)
+    GameConfig.add_arguments(parser)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="per-move time budget (iterative deepening) instead of fixed depths")
+    parser.add_argument('--player-agent', choices=AGENTS, default='minimax')
+    parser.add_argument('--ai-agent', choices=AGENTS, default='minimax')
+    parser.add_argument('--book', metavar='BOOK', default=None, help="opening book for minimax agents (see book.py)")
+    parser.add_argument('--ai-weights', metavar='FILE', default=None,
+                        help="evaluation weights file for the AI (the player keeps the defaults)")
+    parser.add_argument('--record', metavar='DIR', default=None, help="write a replay log per game to DIR")
+    args = parser.parse_args()
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    weights = None
+    if args.ai_weights:
+        with open(args.ai_weights) as f:
+            weights = {AI: json.load(f)['weights'], PLAYER: DEFAULT_WEIGHTS}
+    start = time.perf_counter()
+    results = run_tournament(args.games, args.seed, args.workers, args.player_depth, args.ai_depth,
+                             GameConfig.from_args(args), args.budget_ms, args.player_agent, args.ai_agent,
+                             args.record, args.book, weights)
+    summary = summarize(results, time.perf_counter() - start)
+    print(f"games:        {summary['games']}")
+    print(f"AI wins:      {summary['ai_win_rate']:.1%}")
+    print(f"player wins:  {summary['player_win_rate']:.1%}")
+    print(f"draws:        {summary['draw_rate']:.1%}")
+    print(f"mean margin:  {summary['mean_margin']:+.2f} (AI - player)")
+    print(f"games/sec:    {summary['games_per_sec']:.1f}")
+    if args.book:
+        print(f"book moves:   {summary['book_moves_per_game']:.1f} per game")
+    if 'playouts_per_sec' in summary:
+        print(f"playouts/sec: {summary['playouts_per_sec']:,.0f} (MCTS)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_worker import _init_worker, search_move
+from book import BOOK_PATH
+from game_state import AI, GAME_DURATION, GRID_HEIGHT, GRID_WIDTH, PLAYER, GameConfig
+from search import WEIGHTS_PATH
+from workers import worker_context
+
+# Local match server: many human-vs-AI games in one process, played over
+# localhost TCP with one JSON object per line each way. Every game is a
+# headless GameState; a "move" request plays the player's step, then the
+# AI's reply, then advances one tick, like one AI move slot of check.py.
+# AI searches from all games go to one shared process pool. Each game has a
+# time budget per AI move, counted from when the request arrived, so time
+# spent queued for a worker comes out of the search and not on top of it.
+#   python server.py --port 8765 --workers 4 --budget-ms 50
+#
+# Requests and replies (every reply is the game's state, or {"error": ...}):
+#   {"op": "new", "seed": 1, "budget_ms": 50, "width": 15, "height": 15, "duration": 30}
+#   {"op": "move", "game": 3, "dir": "w"}     w/a/s/d, or "stay" (also while frozen)
+#   {"op": "state", "game": 3}
+#   {"op": "close", "game": 3}
+# Games belong to the connection that created them and end with it. Each
+# connection's requests are answered in order; a client plays games side by
+# side over separate connections.
+
+DIRECTION_KEYS = {'w': (0, -1), 's': (0, 1), 'a': (-1, 0), 'd': (1, 0)}
+DEFAULT_BUDGET_MS = 50
+MAX_BUDGET_MS = 2000
+MIN_SEARCH_MS = 5  # Searched even when the request waited past its budget
+MAX_GRID = 100  # Largest width or height a client may ask for
+MAX_DURATION = 3600  # Longest game a client may ask for, in seconds
+MAX_LINE = 1 << 16
+
+
+def search_until(state, side, deadline, max_depth):
+    # search_move with whatever is left of the budget when a worker picks
+    # the search up (deadline is a time.time() value)
+    budget_ms = max(MIN_SEARCH_MS, (deadline - time.time()) * 1000)
+    return search_move(state, side, budget_ms, max_depth)
+
+
+class Session:
+    def __init__(self, game_id, config, seed, budget_ms):
+        self.game_id = game_id
+        self.config = config
+        self.state = config.new_game(seed)
+        self.budget_ms = budget_ms
+
+    def over(self):
+        return self.state.tick >= self.config.game_ticks or self.state.game_over()
+
+    def describe(self):
+        state = self.state
+        width = state.width
+        x, y = state.player_pos
+        valid = state.get_valid_moves(PLAYER)
+        moves = [key for key, (dx, dy) in DIRECTION_KEYS.items() if (x + dx, y + dy) in valid]
+        return {
+            'game': self.game_id,
+            'tick': state.tick,
+            'ticks': self.config.game_ticks,
+            'scores': [state.player_score, state.ai_score],
+            'player': list(state.player_pos),
+            'ai': list(state.ai_pos),
+            'power_ups': [[index % width, index // width, state.power_up_at(index)]
+                          for index in state.power_up_cells()],
+            'frozen': state.frozen(),
+            'moves': [] if state.frozen() else moves,
+            'over': self.over(),
+        }
+
+
+class GameServer:
+    def __init__(self, workers=None, budget_ms=DEFAULT_BUDGET_MS, max_sessions=1000, book_path=BOOK_PATH,
+                 weights_path=None):
+        context = worker_context()
+        # Searches are never cancelled here, so the workers share one
+        # stop event that is never set
+        self.executor = ProcessPoolExecutor(workers, context, _init_worker,
+                                            (context.Event(), book_path, 0, weights_path))
+        self.budget_ms = budget_ms
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.next_id = 1
+        self.moves = 0
+        self.searches = 0
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.handle_request(json.loads(line), owned)
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {'error': str(error)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # Dropped, or sent a line longer than MAX_LINE
+        finally:
+            for game_id in owned:
+                self.sessions.pop(game_id, None)
+            writer.close()
+
+    async def handle_request(self, request, owned):
+        op = request['op']
+        if op == 'new':
+            return self.new_game(request, owned)
+        session = self.sessions.get(request['game'])
+        if session is None or session.game_id not in owned:
+            raise ValueError(f"no game {request['game']} on this connection")
+        if op == 'move':
+            return await self.move(session, request.get('dir', 'stay'))
+        if op == 'state':
+            return session.describe()
+        if op == 'close':
+            owned.discard(session.game_id)
+            del self.sessions[session.game_id]
+            return {'game': session.game_id, 'closed': True}
+        raise ValueError(f"unknown op {op!r}")
+
+    def new_game(self, request, owned):
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError(f"server full ({self.max_sessions} games)")
+        width = request.get('width', GRID_WIDTH)
+        height = request.get('height', GRID_HEIGHT)
+        if max(width, height) > MAX_GRID:
+            raise ValueError(f"grid is larger than {MAX_GRID}x{MAX_GRID}")
+        duration = request.get('duration', GAME_DURATION)
+        if not isinstance(duration, (int, float)) or not 0 < duration <= MAX_DURATION:
+            raise ValueError(f"duration must be a number of seconds between 0 and {MAX_DURATION}")
+        config = GameConfig(width, height, duration)
+        budget_ms = min(MAX_BUDGET_MS, max(MIN_SEARCH_MS, request.get('budget_ms', self.budget_ms)))
+        session = Session(self.next_id, config, request.get('seed'), budget_ms)
+        # Only a game whose first reply could be built is kept
+        reply = session.describe()
+        self.next_id += 1
+        self.sessions[session.game_id] = session
+        owned.add(session.game_id)
+        return reply
+
+    async def move(self, session, direction):
+        received = time.time()
+        if session.over():
+            raise ValueError("game over")
+        state = session.state
+        if not state.frozen() and direction != 'stay':
+            if direction not in DIRECTION_KEYS:
+                raise ValueError(f"unknown direction {direction!r}")
+            if not state.move_player(*DIRECTION_KEYS[direction]):
+                raise ValueError(f"illegal move {direction!r}")
+        ai_move = None
+        stats = None
+        if not state.frozen() and not state.game_over():
+            deadline = received + session.budget_ms / 1000
+            max_depth = max(1, session.config.game_ticks - state.tick)
+            ai_move, stats = await asyncio.get_running_loop().run_in_executor(
+                self.executor, search_until, state.copy(), AI, deadline, max_depth)
+            self.searches += 1
+            if ai_move:
+                state.play_move(ai_move, AI)
+        state.advance_tick()
+        state.maybe_spawn_power_up(session.config.tick_power_up_chance)
+        self.moves += 1
+        reply = session.describe()
+        reply['ai_move'] = list(ai_move) if ai_move else None
+        if stats is not None:
+            reply['depth'] = stats.depth
+            reply['book'] = stats.book_move
+        reply['server_ms'] = round((time.time() - received) * 1000, 3)
+        return reply
+
+
+async def serve(host, port, workers, budget_ms, max_sessions, book_path, weights_path):
+    server = GameServer(workers, budget_ms, max_sessions, book_path, weights_path)
+    host, port = await server.start(host, port)
+    # The load-test client reads this line to find the port
+    print(f"listening on {host}:{port}", flush=True)
+    # Stop cleanly on SIGTERM too, so the search processes do not outlive us
+    stopped = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local server for many concurrent human-vs-AI games")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help="0 picks a free port")
+    parser.add_argument('--workers', type=int, default=None, help="AI search processes (default: all cores)")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="default AI time per move, from request to reply")
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--book', default=BOOK_PATH, help="opening book file ('' for none)")
+    parser.add_argument('--weights', default=WEIGHTS_PATH, help="evaluation weights file from tune.py")
+    args = parser.parse_args()
+    weights_path = args.weights if args.weights and os.path.exists(args.weights) else None
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.budget_ms, args.max_sessions, args.book,
+                          weights_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
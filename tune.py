@@ -0,0 +1,151 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from game_state import AI, PLAYER, GameConfig
+from search import DEFAULT_WEIGHTS, WEIGHTS_PATH, round_weight
+from selfplay import play_game
+
+# SPSA tuning of the evaluation weights (search.DEFAULT_WEIGHTS) by headless
+# self-play. Every iteration perturbs all weights at once by +-c in random
+# directions, plays the two perturbed sets against each other on a batch of
+# seeded games (each seed twice, colours swapped) across all cores, and steps
+# the weights along the estimated gradient of the score margin. An
+# iteration costs the same number of games whatever the number of weights.
+#
+# Each finished iteration is appended to the log as a JSON line and the
+# current weights are written to the weights file, which check.py and
+# selfplay.py --ai-weights load. Running the same command again resumes from
+# the last complete line of the log.
+#   python tune.py --iterations 300 --games 64 --log tune.jsonl --out weights.json
+
+# Standard SPSA gain schedules: a_k = A_GAIN / (k + 1 + STABILITY) ** ALPHA,
+# c_k = C_GAIN / (k + 1) ** GAMMA
+A_GAIN = 2.0
+C_GAIN = 1.0
+STABILITY = 50
+ALPHA = 0.602
+GAMMA = 0.101
+WEIGHT_LIMIT = 20  # Weights are kept within +-WEIGHT_LIMIT
+# Random moves at the start of every game; without them most seeds play out
+# identically for both weight sets and tell nothing
+RANDOM_OPENING = 8
+
+
+def _play_pair(args):
+    # Margin of plus over minus on one seed, once from each side
+    seed, plus, minus, depth, config = args
+    first = play_game(seed, depth, depth, config, weights={AI: plus, PLAYER: minus}, random_opening=RANDOM_OPENING)
+    second = play_game(seed, depth, depth, config, weights={AI: minus, PLAYER: plus}, random_opening=RANDOM_OPENING)
+    return (first['ai_score'] - first['player_score']) + (second['player_score'] - second['ai_score'])
+
+
+def read_log(path):
+    # The complete records of a tuning log. A line cut short by an
+    # interruption is cut off the file, so new records append cleanly.
+    records = []
+    if not os.path.exists(path):
+        return records
+    complete = 0
+    with open(path, 'rb+') as f:
+        for line in f:
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("unterminated line")
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            complete += len(line)
+        f.truncate(complete)
+    return records
+
+
+def write_weights(path, weights, iteration, games):
+    # Replace the weights file in one step, so a reader never sees half of it
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({'weights': {name: round_weight(value) for name, value in weights.items()},
+                   'iterations': iteration + 1, 'games': games}, f, indent=2)
+    os.replace(temporary, path)
+
+
+def perturb(weights, direction, scale):
+    # Unrounded, so small steps add up; search.set_weights rounds on install
+    return {name: max(-WEIGHT_LIMIT, min(WEIGHT_LIMIT, value + scale * direction[name]))
+            for name, value in weights.items()}
+
+
+def tune(iterations, games, depth, config, log_path, out_path, seed=0, workers=None):
+    records = read_log(log_path)
+    if records:
+        weights = records[-1]['weights']
+        start_iteration = records[-1]['iteration'] + 1
+        total_games = records[-1]['games']
+        print(f"resuming at iteration {start_iteration} from {log_path}")
+    else:
+        weights = dict(DEFAULT_WEIGHTS)
+        start_iteration = 0
+        total_games = 0
+    pairs = max(1, games // 2)
+
+    with multiprocessing.Pool(workers) as pool, open(log_path, 'a') as log:
+        for iteration in range(start_iteration, iterations):
+            started = time.perf_counter()
+            # Seeded by iteration, so a resumed run makes the same choices
+            rng = random.Random(seed * 1_000_003 + iteration)
+            direction = {name: rng.choice((-1, 1)) for name in weights}
+            a = A_GAIN / (iteration + 1 + STABILITY) ** ALPHA
+            c = C_GAIN / (iteration + 1) ** GAMMA
+            plus = perturb(weights, direction, c)
+            minus = perturb(weights, direction, -c)
+            jobs = [(seed + iteration * pairs + pair, plus, minus, depth, config) for pair in range(pairs)]
+            margin = sum(pool.imap_unordered(_play_pair, jobs)) / (2 * pairs)
+            # Gradient estimate of the per-game margin: margin / (2c * direction)
+            weights = perturb(weights, direction, a * margin / (2 * c))
+            total_games += 2 * pairs
+            record = {'iteration': iteration, 'weights': weights, 'margin': margin, 'plus': plus, 'minus': minus,
+                      'games': total_games, 'seconds': round(time.perf_counter() - started, 3)}
+            log.write(json.dumps(record) + '\n')
+            log.flush()
+            write_weights(out_path, weights, iteration, total_games)
+            shown = ', '.join(f"{name} {value:.2f}" for name, value in weights.items())
+            print(f"iteration {iteration}: margin {margin:+.2f}, {shown} ({record['seconds']:.1f}s)")
+    return weights
+
+
+def validate(weights, games, depth, config, seed, workers=None):
+    # Mean margin per game of the tuned weights against the defaults, on
+    # seeds the tuning did not use
+    jobs = [(seed + pair, weights, DEFAULT_WEIGHTS, depth, config) for pair in range(max(1, games // 2))]
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.imap_unordered(_play_pair, jobs)) / (2 * len(jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights by self-play (SPSA)")
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--games', type=int, default=64,
+                        help="games per iteration (each seed is played from both sides)")
+    parser.add_argument('--depth', type=int, default=2, help="search depth of both sides")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--log', default='tune.jsonl', help="JSON-lines log of every iteration (resumed from)")
+    parser.add_argument('--out', default=WEIGHTS_PATH, help="weights file the AI loads")
+    parser.add_argument('--validate', type=int, default=0, metavar='GAMES',
+                        help="afterwards, play this many games of the tuned weights against the defaults")
+    GameConfig.add_arguments(parser)
+    args = parser.parse_args()
+    config = GameConfig.from_args(args)
+
+    weights = tune(args.iterations, args.games, args.depth, config, args.log, args.out, args.seed, args.workers)
+    if args.validate:
+        # Far past the seeds of any tuning iteration
+        margin = validate(weights, args.validate, args.depth, config, args.seed + 10 ** 9, args.workers)
+        print(f"tuned vs default weights: {margin:+.2f} points per game over {args.validate} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import multiprocessing
+
+# Start method for every worker pool (ai_worker.py, parallel_search.py,
+# multiagent.py, server.py). Fork where the platform has it, so workers do
+# not re-import (and re-initialize) the pygame front end or rebuild the
+# shared tables; elsewhere the platform default, which pickles what each
+# worker is given.
+
+
+def worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)